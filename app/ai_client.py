@@ -1,76 +1,138 @@
-"""AI client for Groq API integration."""
+"""AI client for skill gap analysis and quiz generation."""
 import os
 import json
-from typing import Dict, List, Any, Optional
-from groq import Groq
+import time
+import asyncio
+from typing import Dict, List, Any, Optional, AsyncIterator
 from dotenv import load_dotenv
+from app import metrics
+from app.analysis_cache import make_key
+from app.gap_engine import normalize_skill_name
+from app.llm_output import parse_analysis, parse_narrative, parse_quiz
+from app.llm_providers import llm_provider
+from app.prompt_budget import count_tokens, prompt_builder
+from app.single_flight import quiz_flight, analysis_flight
+from app.llm_governor import GovernedProvider, llm_governor
 
 load_dotenv()
 
 
 class AIClient:
-    """Client for interacting with Groq API."""
-
-    def __init__(self):
-        """Initialize Groq client."""
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.client = Groq(api_key=self.api_key) if self.api_key else None
-        self.model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+    """
+    Client for LLM-backed analysis and quizzes.
+
+    Completions go through a provider from app.llm_providers (Groq by
+    default; see LLM_PROVIDER), so a local stub or recorded replies can
+    stand in for the hosted model. The default provider is wrapped in the
+    shared llm_governor, so sync and async clients draw on the same rate
+    limits and circuit breaker. Identical quiz and analysis calls that
+    overlap share one completion (see app.single_flight); each caller
+    parses its own copy of the output, tolerantly and against the response
+    schemas (see app.llm_output).
+    """
+
+    def __init__(self, provider=None):
+        """Initialize with a provider, defaulting to the governed one selected by LLM_PROVIDER."""
+        self.provider = provider or GovernedProvider(llm_provider, llm_governor)
+
+    @property
+    def model(self) -> str:
+        """Model name of the current provider."""
+        return self.provider.model
 
     def is_configured(self) -> bool:
-        """Check if API key is configured."""
-        return self.api_key is not None and self.api_key != ""
+        """Check if the provider is usable (e.g. an API key is set)."""
+        return self.provider.is_configured()
 
-    def generate_skill_gap_analysis(
+    def _complete(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Send a single-message chat completion and return its content."""
+        start = time.perf_counter()
+        try:
+            completion = self.provider.complete(prompt, temperature, max_tokens)
+        except Exception:
+            metrics.record_llm_call(self.model, time.perf_counter() - start, failed=True)
+            raise
+        metrics.record_llm_call(self.model, time.perf_counter() - start, completion.usage)
+        return completion.content
+
+    @staticmethod
+    def analysis_error(e: Exception) -> Dict[str, Any]:
+        """Fallback analysis payload returned when the AI call fails."""
+        return {
+            "error": f"AI analysis failed: {str(e)}",
+            "analysis": {"missing": [], "underdeveloped": [], "fit_score": 0},
+            "recommendations": [],
+            "study_plan": "Unable to generate study plan",
+            "ai_used": False
+        }
+
+    @staticmethod
+    def measure_prompt(kind: str, prompt: str) -> int:
+        """Count a prompt's tokens and record them under the current route."""
+        tokens = count_tokens(prompt)
+        metrics.record_prompt_tokens(kind, tokens)
+        return tokens
+
+    def quiz_key(self, skill: str) -> str:
+        """Single-flight key of a quiz: the model and the normalized skill name."""
+        return f"{self.model}:{normalize_skill_name(skill)}"
+
+    def analysis_key(
         self,
         user_skills: List[Dict[str, Any]],
         user_certifications: List[Dict[str, str]],
         user_achievements: List[Dict[str, str]],
         target_role: str,
-        course_catalog: List[Dict[str, str]]
-    ) -> Dict[str, Any]:
+        requirements: Optional[Dict[str, int]],
+        courses: List[Dict[str, str]],
+        kind: str
+    ) -> str:
         """
-        Generate skill gap analysis using Groq AI.
-        
-        Args:
-            user_skills: List of user's current skills with levels
-            user_certifications: List of user's certifications
-            user_achievements: List of user's achievements
-            target_role: Target job role name
-            course_catalog: Available courses
-            
-        Returns:
-            Analysis results with recommendations and study plan
+        Single-flight key of an analysis or narrative prompt.
+
+        Uses the analysis cache's normalized key, so profiles that differ
+        only in case, whitespace or ordering share one call.
         """
-        if not self.is_configured():
-            return {"error": "GROQ_API_KEY not configured"}
+        return make_key(
+            user_skills, user_certifications, user_achievements, target_role, requirements, courses, kind, self.model
+        )
 
-        # Format user profile
-        skills_text = ", ".join([f"{s['name']} (Level {s['level']}/5)" for s in user_skills]) if user_skills else "None"
-        
-        certifications_text = ""
-        if user_certifications:
-            certifications_text = "\n".join([
-                f"- {c['name']} from {c['issuer']} (obtained: {c['date_obtained']})"
-                for c in user_certifications
-            ])
-        else:
-            certifications_text = "None"
-        
-        achievements_text = ""
-        if user_achievements:
-            achievements_text = "\n".join([
-                f"- {a['title']}: {a['description']} ({a['date']})"
-                for a in user_achievements
-            ])
-        else:
-            achievements_text = "None"
+    def build_gap_analysis_prompt(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        course_catalog: List[Dict[str, str]],
+        requirements: Optional[Dict[str, int]] = None
+    ) -> str:
+        """
+        Build the full skill gap analysis prompt.
 
-        # Format course catalog
-        course_list = "\n".join([
+        The profile and course list are fitted into the prompt_builder's
+        per-section token budgets, keeping the items most relevant to the
+        role (its requirements, when given).
+        """
+        profile = prompt_builder.select(user_skills, user_certifications, user_achievements, target_role, requirements)
+        skills_text = ", ".join(prompt_builder.fit(
+            [f"{s['name']} (Level {s['level']}/5)" for s in profile.skills], prompt_builder.skills_budget
+        )) or "None"
+
+        certifications_text = "\n".join(prompt_builder.fit([
+            f"- {c['name']} from {c['issuer']} (obtained: {c['date_obtained']})"
+            for c in profile.certifications
+        ], prompt_builder.certifications_budget)) or "None"
+
+        achievements_text = "\n".join(prompt_builder.fit([
+            f"- {a['title']}: {a['description']} ({a['date']})"
+            for a in profile.achievements
+        ], prompt_builder.achievements_budget)) or "None"
+
+        # Format course catalog, already ordered by relevance
+        course_list = "\n".join(prompt_builder.fit([
             f"- {c['title']} by {c['provider']} ({c['level']}) - focuses on {c['related_skill']}"
             for c in course_catalog
-        ])
+        ], prompt_builder.courses_budget))
 
         prompt = f"""You are an AI career advisor. Analyze this person's qualifications for the role of {target_role}.
 
@@ -108,52 +170,57 @@ Provide your analysis as a JSON object with this EXACT structure:
 }}
 
 Output ONLY the JSON, no other text or explanation."""
+        return prompt
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=2000
-            )
+    def build_gap_narrative_prompt(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        analysis: Dict[str, Any],
+        recommendations: List[Dict[str, str]]
+    ) -> str:
+        """Build the narrative-only (assessment and study plan) prompt, within the same token budgets."""
+        gaps = {skill: 1 for skill in analysis.get("missing", [])}
+        gaps.update({item["skill"]: item["required"] for item in analysis.get("underdeveloped", [])})
+        profile = prompt_builder.select(user_skills, user_certifications, user_achievements, target_role, gaps)
+        skills_text = ", ".join(prompt_builder.fit(
+            [f"{s['name']} (Level {s['level']}/5)" for s in profile.skills], prompt_builder.skills_budget
+        )) or "None"
+        certifications_text = ", ".join(prompt_builder.fit(
+            [f"{c['name']} from {c['issuer']}" for c in profile.certifications], prompt_builder.certifications_budget
+        )) or "None"
+        achievements_text = ", ".join(prompt_builder.fit(
+            [a["title"] for a in profile.achievements], prompt_builder.achievements_budget
+        )) or "None"
+        courses_text = "\n".join([f"- {r['title']} ({r['level']}) for {r['related_skill']}" for r in recommendations]) or "None"
+
+        prompt = f"""You are an AI career advisor. A candidate is targeting the role of {target_role}.
 
-            content = response.choices[0].message.content.strip()
-            
-            # Clean up markdown code blocks if present
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-
-            result = json.loads(content)
-            result["ai_used"] = True
-            return result
+Skills: {skills_text}
+Certifications: {certifications_text}
+Achievements: {achievements_text}
 
-        except Exception as e:
-            return {
-                "error": f"AI analysis failed: {str(e)}",
-                "analysis": {"missing": [], "underdeveloped": [], "fit_score": 0},
-                "recommendations": [],
-                "study_plan": "Unable to generate study plan",
-                "ai_used": False
-            }
-
-    def generate_quiz(self, skill: str) -> Dict[str, Any]:
-        """
-        Generate a self-assessment quiz for a skill.
-        
-        Args:
-            skill: Skill name to generate quiz for
-            
-        Returns:
-            Quiz with 4 multiple-choice questions
-        """
-        if not self.is_configured():
-            return {"error": "GROQ_API_KEY not configured"}
+Gap analysis (already computed, do not change it):
+{json.dumps(analysis)}
+
+Recommended courses:
+{courses_text}
+
+Write a brief assessment of their readiness and a week-by-week study plan using the recommended courses.
+
+Provide your answer as a JSON object with this EXACT structure:
+{{
+  "overall_assessment": "Brief assessment of their readiness",
+  "study_plan": "Week-by-week study plan with realistic timelines"
+}}
+
+Output ONLY the JSON, no other text or explanation."""
+        return prompt
 
+    def build_quiz_prompt(self, skill: str) -> str:
+        """Build the quiz generation prompt."""
         prompt = f"""Create 4 multiple-choice questions for the skill: {skill}. 
 Each question has 4 options and one correct answer (index 0-3).
 Output ONLY valid JSON:
@@ -171,28 +238,125 @@ Output ONLY valid JSON:
 
 Include a mix of difficulties: 1 beginner, 2 intermediate, 1 advanced.
 Do not include commentary or explanations. Output valid JSON only."""
+        return prompt
+
+    def generate_skill_gap_analysis(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        course_catalog: List[Dict[str, str]],
+        requirements: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate skill gap analysis using Groq AI.
+        
+        Args:
+            user_skills: List of user's current skills with levels
+            user_certifications: List of user's certifications
+            user_achievements: List of user's achievements
+            target_role: Target job role name
+            course_catalog: Available courses
+            requirements: Role requirements, used to rank profile items for the prompt
+            
+        Returns:
+            Analysis results with recommendations, study plan and the prompt's token count
+        """
+        if not self.is_configured():
+            return {"error": "GROQ_API_KEY not configured"}
+
+        prompt = self.build_gap_analysis_prompt(
+            user_skills, user_certifications, user_achievements, target_role, course_catalog, requirements
+        )
+        prompt_tokens = self.measure_prompt("analysis", prompt)
+
+        key = self.analysis_key(
+            user_skills, user_certifications, user_achievements, target_role, requirements, course_catalog, "ai"
+        )
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.8,
-                max_tokens=1500
-            )
+            content = analysis_flight.do(key, lambda: self._complete(prompt, temperature=0.7, max_tokens=2000))
+            result = parse_analysis(content)
+            result["prompt_tokens"] = prompt_tokens
+            return result
 
-            content = response.choices[0].message.content.strip()
+        except Exception as e:
+            return self.analysis_error(e)
+
+    def generate_gap_narrative(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        analysis: Dict[str, Any],
+        recommendations: List[Dict[str, str]],
+        requirements: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate only the narrative parts of a gap analysis.
+
+        The numeric analysis and course recommendations are computed locally,
+        so the model only writes the overall assessment and study plan.
+
+        Args:
+            user_skills: List of user's current skills with levels
+            user_certifications: List of user's certifications
+            user_achievements: List of user's achievements
+            target_role: Target job role name
+            analysis: Locally computed missing/underdeveloped/fit_score block
+            recommendations: Locally selected course recommendations
+            requirements: Role requirement map the analysis was computed against
+
+        Returns:
+            Dict with overall_assessment and study_plan
+        """
+        if not self.is_configured():
+            return {"error": "GROQ_API_KEY not configured"}
+
+        prompt = self.build_gap_narrative_prompt(
+            user_skills, user_certifications, user_achievements, target_role, analysis, recommendations
+        )
+        prompt_tokens = self.measure_prompt("narrative", prompt)
+
+        key = self.analysis_key(
+            user_skills, user_certifications, user_achievements, target_role, requirements, recommendations, "narrative"
+        )
+
+        try:
+            content = analysis_flight.do(key, lambda: self._complete(prompt, temperature=0.7, max_tokens=800))
+            return {**parse_narrative(content), "prompt_tokens": prompt_tokens}
+
+        except Exception as e:
+            return {"error": f"AI narrative failed: {str(e)}"}
+
+    def generate_quiz(self, skill: str, coalesce: bool = True) -> Dict[str, Any]:
+        """
+        Generate a self-assessment quiz for a skill.
+        
+        Args:
+            skill: Skill name to generate quiz for
+            coalesce: Share the completion with identical calls in flight; the
+                quiz pool turns this off so parallel refills get different quizzes
             
-            # Clean up markdown code blocks if present
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-
-            result = json.loads(content)
-            return result
+        Returns:
+            Quiz with 4 multiple-choice questions
+        """
+        if not self.is_configured():
+            return {"error": "GROQ_API_KEY not configured"}
+
+        prompt = self.build_quiz_prompt(skill)
+        self.measure_prompt("quiz", prompt)
+
+        try:
+            if coalesce:
+                content = quiz_flight.do(
+                    self.quiz_key(skill), lambda: self._complete(prompt, temperature=0.8, max_tokens=1500)
+                )
+            else:
+                content = self._complete(prompt, temperature=0.8, max_tokens=1500)
+            return parse_quiz(content, skill)
 
         except Exception as e:
             return {"error": f"Quiz generation failed: {str(e)}"}
@@ -246,5 +410,173 @@ Do not include commentary or explanations. Output valid JSON only."""
         }
 
 
-# Global AI client instance
-ai_client = AIClient()
\ No newline at end of file
+class AsyncAIClient(AIClient):
+    """
+    Async client for LLM-backed analysis and quizzes.
+
+    Calls are parked on the event loop instead of holding a threadpool
+    thread, and at most AI_MAX_CONCURRENCY requests are sent at once.
+    """
+
+    def __init__(self, provider=None):
+        """Initialize with a provider and the concurrency limit."""
+        super().__init__(provider)
+        self.max_concurrency = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _complete(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Send a single-message chat completion and return its content."""
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                completion = await self.provider.acomplete(prompt, temperature, max_tokens)
+            except Exception:
+                metrics.record_llm_call(self.model, time.perf_counter() - start, failed=True)
+                raise
+        metrics.record_llm_call(self.model, time.perf_counter() - start, completion.usage)
+        return completion.content
+
+    async def _stream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """
+        Stream a single-message chat completion as content deltas.
+
+        Latency is recorded when the stream ends or is abandoned, with the
+        token usage if the provider reported it.
+        """
+        async with self._semaphore:
+            start = time.perf_counter()
+            usage = None
+            failed = False
+            try:
+                async for delta in self.provider.astream(prompt, temperature, max_tokens):
+                    usage = delta.usage or usage
+                    if delta.content:
+                        yield delta.content
+            except Exception:
+                failed = True
+                raise
+            finally:
+                # Also runs when the client disconnects mid-stream
+                metrics.record_llm_call(self.model, time.perf_counter() - start, usage, failed)
+
+    def stream_skill_gap_analysis(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        course_catalog: List[Dict[str, str]],
+        requirements: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Stream the raw model output of a full skill gap analysis."""
+        prompt = self.build_gap_analysis_prompt(
+            user_skills, user_certifications, user_achievements, target_role, course_catalog, requirements
+        )
+        self.measure_prompt("analysis", prompt)
+        return self._stream(prompt, temperature=0.7, max_tokens=2000)
+
+    def stream_gap_narrative(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        analysis: Dict[str, Any],
+        recommendations: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        """Stream the raw model output of the narrative-only prompt."""
+        prompt = self.build_gap_narrative_prompt(
+            user_skills, user_certifications, user_achievements, target_role, analysis, recommendations
+        )
+        self.measure_prompt("narrative", prompt)
+        return self._stream(prompt, temperature=0.7, max_tokens=800)
+
+    async def generate_skill_gap_analysis(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        course_catalog: List[Dict[str, str]],
+        requirements: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """Async version of AIClient.generate_skill_gap_analysis."""
+        if not self.is_configured():
+            return {"error": "GROQ_API_KEY not configured"}
+
+        prompt = self.build_gap_analysis_prompt(
+            user_skills, user_certifications, user_achievements, target_role, course_catalog, requirements
+        )
+        prompt_tokens = self.measure_prompt("analysis", prompt)
+
+        key = self.analysis_key(
+            user_skills, user_certifications, user_achievements, target_role, requirements, course_catalog, "ai"
+        )
+
+        try:
+            content = await analysis_flight.ado(
+                key, lambda: self._complete(prompt, temperature=0.7, max_tokens=2000)
+            )
+            result = parse_analysis(content)
+            result["prompt_tokens"] = prompt_tokens
+            return result
+
+        except Exception as e:
+            return self.analysis_error(e)
+
+    async def generate_gap_narrative(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        analysis: Dict[str, Any],
+        recommendations: List[Dict[str, str]],
+        requirements: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """Async version of AIClient.generate_gap_narrative."""
+        if not self.is_configured():
+            return {"error": "GROQ_API_KEY not configured"}
+
+        prompt = self.build_gap_narrative_prompt(
+            user_skills, user_certifications, user_achievements, target_role, analysis, recommendations
+        )
+        prompt_tokens = self.measure_prompt("narrative", prompt)
+
+        key = self.analysis_key(
+            user_skills, user_certifications, user_achievements, target_role, requirements, recommendations, "narrative"
+        )
+
+        try:
+            content = await analysis_flight.ado(
+                key, lambda: self._complete(prompt, temperature=0.7, max_tokens=800)
+            )
+            return {**parse_narrative(content), "prompt_tokens": prompt_tokens}
+
+        except Exception as e:
+            return {"error": f"AI narrative failed: {str(e)}"}
+
+    async def generate_quiz(self, skill: str, coalesce: bool = True) -> Dict[str, Any]:
+        """Async version of AIClient.generate_quiz."""
+        if not self.is_configured():
+            return {"error": "GROQ_API_KEY not configured"}
+
+        prompt = self.build_quiz_prompt(skill)
+        self.measure_prompt("quiz", prompt)
+
+        try:
+            if coalesce:
+                content = await quiz_flight.ado(
+                    self.quiz_key(skill), lambda: self._complete(prompt, temperature=0.8, max_tokens=1500)
+                )
+            else:
+                content = await self._complete(prompt, temperature=0.8, max_tokens=1500)
+            return parse_quiz(content, skill)
+
+        except Exception as e:
+            return {"error": f"Quiz generation failed: {str(e)}"}
+
+
+# Global AI client instances
+ai_client = AIClient()
+async_ai_client = AsyncAIClient()
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""Two-tier (memory LRU + SQLite) cache for AI gap analysis results."""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def catalog_version(course_catalog: List[Dict[str, str]]) -> str:
+    """Content hash of the course catalog, independent of row order."""
+    rows = sorted(json.dumps(c, sort_keys=True) for c in course_catalog)
+    return hashlib.sha256("\n".join(rows).encode()).hexdigest()[:16]
+
+
+def make_key(
+    user_skills: List[Dict[str, Any]],
+    user_certifications: List[Dict[str, str]],
+    user_achievements: List[Dict[str, str]],
+    target_role: str,
+    requirements: Optional[Dict[str, int]],
+    course_catalog: List[Dict[str, str]],
+    mode: str,
+    model: str
+) -> str:
+    """
+    Build a content-addressed cache key for an analysis request.
+
+    Inputs are normalized (case, whitespace, ordering) so that equivalent
+    profiles map to the same key. The role's requirements are part of the
+    key, so editing a role (e.g. through the bulk role upsert) stops
+    serving results computed against its old requirements.
+    """
+    def norm(value: Any) -> Any:
+        return value.strip().lower() if isinstance(value, str) else value
+
+    def norm_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        normalized = [{k: norm(v) for k, v in row.items()} for row in rows]
+        return sorted(normalized, key=lambda row: json.dumps(row, sort_keys=True))
+
+    payload = {
+        "skills": norm_rows(user_skills),
+        "certifications": norm_rows(user_certifications),
+        "achievements": norm_rows(user_achievements),
+        "role": norm(target_role),
+        "requirements": {norm(skill): level for skill, level in (requirements or {}).items()},
+        "catalog": catalog_version(course_catalog),
+        "mode": mode,
+        "model": model
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class AnalysisCache:
+    """In-process LRU backed by a persistent SQLite table, both with TTL."""
+
+    def __init__(
+        self,
+        path: str = os.getenv("ANALYSIS_CACHE_PATH", "./analysis_cache.db"),
+        ttl: int = int(os.getenv("ANALYSIS_CACHE_TTL", "86400")),
+        memory_size: int = int(os.getenv("ANALYSIS_CACHE_MEMORY_SIZE", "256")),
+        disk_size: int = int(os.getenv("ANALYSIS_CACHE_DISK_SIZE", "10000"))
+    ):
+        """Initialize cache tiers and create the SQLite table if needed."""
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_analysis_cache_accessed ON analysis_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up a cached result.
+
+        Returns:
+            (value, tier) where tier is "memory", "disk" or "miss"
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1], "memory"
+            if entry:
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] < self.ttl:
+                self._conn.execute(
+                    "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                self.stats["disk_hits"] += 1
+                return value, "disk"
+            if row:
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._conn.commit()
+
+            self.stats["misses"] += 1
+            return None, "miss"
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result in both tiers, evicting expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            expired = self._conn.execute(
+                "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+            overflow = self._conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN ("
+                "SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_size,)
+            ).rowcount
+            self._conn.commit()
+            self.stats["stores"] += 1
+            self.stats["evictions"] += expired + overflow
+
+    def _remember(self, key: str, created_at: float, value: Dict[str, Any]) -> None:
+        """Insert into the memory tier and trim it to memory_size."""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self._memory)
+        stats["disk_entries"] = disk_entries
+        return stats
+
+
+# Global analysis cache instance
+analysis_cache = AnalysisCache()
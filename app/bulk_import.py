@@ -0,0 +1,109 @@
+"""Parsing and validation of bulk import uploads (JSON, NDJSON, CSV)."""
+import csv
+import io
+import json
+from typing import Dict, List, Any, Tuple, Type
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+# Request body description for bulk endpoints in the OpenAPI docs
+BULK_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+            "text/csv": {"schema": {"type": "string"}},
+        }
+    }
+}
+
+
+def parse_requirements(value: Any) -> Any:
+    """Accept role requirements as a dict, a JSON object string or "skill:level;skill:level"."""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value.startswith("{"):
+        return json.loads(value)
+    requirements = {}
+    try:
+        for pair in value.split(";"):
+            if pair.strip():
+                skill, level = pair.rsplit(":", 1)
+                requirements[skill.strip()] = int(level)
+    except ValueError:
+        raise ValueError('requirements: expected a JSON object or "skill:level;skill:level"')
+    return requirements
+
+
+async def read_rows(request: Request) -> List[Tuple[int, Any]]:
+    """
+    Read an upload as (row_number, raw_row) pairs.
+
+    The format follows the Content-Type: a JSON array, NDJSON (one object
+    per line) or CSV with a header row. Rows that cannot be decoded are
+    returned as exceptions so they can be reported per row.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    text = (await request.body()).decode("utf-8-sig")
+
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError as e:
+                rows.append((number, e))
+        return rows
+
+    if content_type == "text/csv":
+        reader = csv.DictReader(io.StringIO(text))
+        return [(number, row) for number, row in enumerate(reader, start=1)]
+
+    if content_type == "application/json":
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of rows")
+        return list(enumerate(data, start=1))
+
+    raise HTTPException(
+        status_code=415,
+        detail="Use application/json, application/x-ndjson or text/csv"
+    )
+
+
+def validate_rows(
+    rows: List[Tuple[int, Any]],
+    schema: Type[BaseModel]
+) -> Tuple[List[Tuple[int, BaseModel]], List[Dict[str, Any]]]:
+    """
+    Validate raw rows against a schema.
+
+    Returns:
+        (valid rows as (row_number, model), errors as {"row", "error"})
+    """
+    valid = []
+    errors = []
+    for number, raw in rows:
+        if isinstance(raw, Exception):
+            errors.append({"row": number, "error": f"Invalid row: {raw}"})
+            continue
+        try:
+            if isinstance(raw, dict) and "requirements" in raw:
+                raw = dict(raw, requirements=parse_requirements(raw["requirements"]))
+            valid.append((number, schema.model_validate(raw)))
+        except (ValidationError, ValueError) as e:
+            if isinstance(e, ValidationError):
+                message = "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                )
+            else:
+                message = str(e)
+            errors.append({"row": number, "error": message})
+    return valid, errors
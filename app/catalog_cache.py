@@ -0,0 +1,98 @@
+"""Process-local snapshots of the role and course catalog."""
+import json
+import threading
+from typing import Dict, List, Any, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from app import models, versions
+
+
+class RoleSnapshot(NamedTuple):
+    """Read-only role row; requirements must not be mutated."""
+    id: int
+    name: str
+    requirements: Dict[str, int]
+
+
+class CourseSnapshot(NamedTuple):
+    """Read-only course row."""
+    id: int
+    title: str
+    provider: str
+    level: str
+    related_skill: str
+
+
+class CatalogSnapshot:
+    """Roles and courses at one catalog version, with their JSON responses pre-serialized."""
+
+    def __init__(self, version: int, roles: List[RoleSnapshot], courses: List[CourseSnapshot]):
+        """Index the rows and serialize the list responses once."""
+        self.version = version
+        self.roles = tuple(roles)
+        self.courses = tuple(courses)
+        self.roles_by_name = {role.name: role for role in roles}
+        self.roles_json = json.dumps([role._asdict() for role in roles]).encode()
+        self.courses_json = json.dumps([course._asdict() for course in courses]).encode()
+
+
+class CatalogCache:
+    """
+    Read-through cache of the current CatalogSnapshot.
+
+    Each lookup compares the shared catalog version (one primary-key read)
+    with the snapshot's, so a role or course written by any worker process
+    is seen on the next request. crud's create paths also clear the cache.
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "rebuilds": 0}
+
+    def clear(self) -> None:
+        """Drop the snapshot so the next lookup rebuilds it."""
+        with self._lock:
+            self._snapshot = None
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        """Return the snapshot for the current catalog version, rebuilding it if stale."""
+        version = versions.get_version(db, versions.CATALOG)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            self.stats["hits"] += 1
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            roles = [
+                RoleSnapshot(role_id, name, requirements)
+                for role_id, name, requirements in
+                db.query(models.Role.id, models.Role.name, models.Role.requirements).order_by(models.Role.id)
+            ]
+            courses = [
+                CourseSnapshot(*row)
+                for row in db.query(
+                    models.Course.id, models.Course.title, models.Course.provider,
+                    models.Course.level, models.Course.related_skill
+                ).order_by(models.Course.id)
+            ]
+            snapshot = CatalogSnapshot(version, roles, courses)
+            self._snapshot = snapshot
+            self.stats["rebuilds"] += 1
+        return snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/rebuild counters and the cached version."""
+        snapshot = self._snapshot
+        stats = dict(self.stats)
+        stats["version"] = snapshot.version if snapshot else None
+        stats["roles"] = len(snapshot.roles) if snapshot else 0
+        stats["courses"] = len(snapshot.courses) if snapshot else 0
+        return stats
+
+
+# Global catalog cache instance
+catalog_cache = CatalogCache()
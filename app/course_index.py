@@ -0,0 +1,164 @@
+"""In-memory relevance index over the course catalog."""
+import os
+import re
+import bisect
+import threading
+from typing import Dict, List, Any, Optional, Set, Iterable
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.catalog_cache import catalog_cache, CatalogSnapshot
+from app.gap_engine import normalize_skill_name
+
+load_dotenv()
+
+# Number of courses included in an analysis prompt
+PROMPT_COURSE_LIMIT = int(os.getenv("ANALYSIS_PROMPT_COURSES", "15"))
+
+STOPWORDS = {"a", "an", "and", "for", "in", "of", "on", "the", "to", "with"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search tokens."""
+    return [t for t in re.findall(r"[a-z0-9+#]+", text.lower()) if t not in STOPWORDS]
+
+
+class CourseIndex:
+    """
+    Courses indexed by normalized related_skill and by title tokens.
+
+    The index follows the catalog cache's snapshot. A new snapshot is
+    applied incrementally: only courses that were added, changed or removed
+    since the last one are (re)indexed, so course updates made by any
+    process are picked up through the shared catalog version without
+    re-tokenizing the whole catalog. crud.create_course also indexes its
+    course right away.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._courses: Dict[int, Dict[str, str]] = {}
+        self._by_skill: Dict[str, List[int]] = {}
+        self._by_token: Dict[str, Set[int]] = {}
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Drop every indexed course so the next refresh reloads the catalog."""
+        with self._lock:
+            self._courses = {}
+            self._by_skill = {}
+            self._by_token = {}
+            self._snapshot = None
+
+    def refresh(self, db: Session) -> None:
+        """Apply the courses added, changed or removed since the last refresh."""
+        snapshot = catalog_cache.get(db)
+        if snapshot is self._snapshot:
+            return
+        with self._lock:
+            if snapshot is self._snapshot:
+                return
+            for course in snapshot.courses:
+                self._index(course)
+            current = {course.id for course in snapshot.courses}
+            for course_id in [course_id for course_id in self._courses if course_id not in current]:
+                self._unindex(course_id)
+            self._snapshot = snapshot
+
+    def add(self, course: Any) -> None:
+        """Index a newly created or updated course; a no-op until the index is loaded."""
+        with self._lock:
+            if self._snapshot is not None:
+                self._index(course)
+
+    def _index(self, course: Any) -> None:
+        """Index one course unless it is already indexed unchanged; caller holds the lock."""
+        fields = {
+            "title": course.title,
+            "provider": course.provider,
+            "level": course.level,
+            "related_skill": course.related_skill
+        }
+        if self._courses.get(course.id) == fields:
+            return
+        if course.id in self._courses:
+            self._unindex(course.id)
+        self._courses[course.id] = fields
+        bisect.insort(self._by_skill.setdefault(normalize_skill_name(course.related_skill), []), course.id)
+        for token in set(tokenize(course.title)):
+            self._by_token.setdefault(token, set()).add(course.id)
+
+    def _unindex(self, course_id: int) -> None:
+        """Remove one course and its postings; caller holds the lock."""
+        fields = self._courses.pop(course_id)
+        skill = normalize_skill_name(fields["related_skill"])
+        self._by_skill[skill].remove(course_id)
+        if not self._by_skill[skill]:
+            del self._by_skill[skill]
+        for token in set(tokenize(fields["title"])):
+            self._by_token[token].discard(course_id)
+            if not self._by_token[token]:
+                del self._by_token[token]
+
+    def courses_for(self, skills: Iterable[str]) -> List[Dict[str, str]]:
+        """Every course whose related_skill is one of the given skills, in catalog order per skill."""
+        with self._lock:
+            return [
+                self._courses[course_id]
+                for skill in dict.fromkeys(normalize_skill_name(skill) for skill in skills)
+                for course_id in self._by_skill.get(skill, [])
+            ]
+
+    def search(self, skill_weights: Dict[str, float], query: str, k: int = PROMPT_COURSE_LIMIT) -> List[Dict[str, str]]:
+        """
+        Return the top-k courses for weighted skills and a free-text query.
+
+        Args:
+            skill_weights: Normalized skill name to weight; matched against
+                related_skill and, at half weight, title tokens
+            query: Free text (e.g. the role name) matched against title tokens
+            k: Maximum number of courses to return
+
+        Returns:
+            Courses ordered by descending relevance
+        """
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for skill, weight in skill_weights.items():
+                for course_id in self._by_skill.get(skill, []):
+                    scores[course_id] = scores.get(course_id, 0) + weight
+                for token in tokenize(skill):
+                    for course_id in self._by_token.get(token, ()):
+                        scores[course_id] = scores.get(course_id, 0) + weight / 2
+            for token in tokenize(query):
+                for course_id in self._by_token.get(token, ()):
+                    scores[course_id] = scores.get(course_id, 0) + 1
+            ranked = sorted(scores, key=lambda course_id: (-scores[course_id], course_id))
+            return [self._courses[course_id] for course_id in ranked[:k]]
+
+    def select_for_analysis(
+        self,
+        user_skills: List[Dict[str, Any]],
+        target_role: str,
+        requirements: Optional[Dict[str, int]] = None,
+        k: int = PROMPT_COURSE_LIMIT
+    ) -> List[Dict[str, str]]:
+        """
+        Pick the courses relevant to a role and the user's gaps.
+
+        Role requirements the user falls short of weigh most, met requirements
+        less, and the user's other skills below level 5 least.
+        """
+        levels = {normalize_skill_name(s["name"]): s["level"] for s in user_skills}
+        weights: Dict[str, float] = {}
+        for skill, required in (requirements or {}).items():
+            key = normalize_skill_name(skill)
+            weights[key] = 3.0 if levels.get(key, 0) < required else 1.0
+        for skill, level in levels.items():
+            if skill not in weights and level < 5:
+                weights[skill] = 0.5
+        return self.search(weights, target_role, k)
+
+
+# Global course index instance
+course_index = CourseIndex()
@@ -1,7 +1,39 @@
 """CRUD operations for database models."""
-from sqlalchemy.orm import Session
+import os
+from sqlalchemy import insert, update, select, func
+from sqlalchemy.orm import Session, selectinload, joinedload, load_only, aliased
 from app import models, schemas
-from typing import List, Optional
+from app.catalog_cache import catalog_cache, RoleSnapshot, CourseSnapshot
+from app.skill_index import skill_index
+from app.course_index import course_index
+from app.skill_vocabulary import skill_vocabulary, normalize_skill_key
+from app import versions
+from app.gap_engine import normalize_skill_name
+from typing import List, Optional, Sequence, Dict, Any, Tuple, Hashable
+
+# Rows per executemany statement in bulk imports
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+
+# User relationships serialized by schemas.User
+PROFILE_RELATIONSHIPS = (models.User.skills, models.User.certifications, models.User.achievements)
+
+# Relationship loader strategies selectable per query:
+# - lazy: load relationships on first access (one query per relationship per user)
+# - selectin: one extra IN query per relationship, best for lists of users
+# - joined: a single LEFT OUTER JOIN query, best for one user with few rows
+LOADER_STRATEGIES = {"lazy": None, "selectin": selectinload, "joined": joinedload}
+
+
+# Scalar user columns that can be selected individually
+USER_FIELDS = ("id", "email", "name", "created_at")
+# Profile relationships that can be included individually
+USER_INCLUDES = ("skills", "certifications", "achievements")
+
+
+def profile_options(load: str) -> list:
+    """Query options that load user profile relationships with the given strategy."""
+    loader = LOADER_STRATEGIES[load]
+    return [loader(relationship) for relationship in PROFILE_RELATIONSHIPS] if loader else []
 
 
 def create_user(db: Session, user: schemas.UserCreate) -> models.User:
@@ -13,9 +45,14 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     return db_user
 
 
-def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    """Get user by ID."""
-    return db.query(models.User).filter(models.User.id == user_id).first()
+def get_user(db: Session, user_id: int, load: str = "lazy") -> Optional[models.User]:
+    """Get user by ID, loading profile relationships with the given strategy."""
+    return (
+        db.query(models.User)
+        .options(*profile_options(load))
+        .filter(models.User.id == user_id)
+        .first()
+    )
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -23,17 +60,109 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    """Get all users."""
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, load: str = "lazy") -> List[models.User]:
+    """Get all users, loading profile relationships with the given strategy."""
+    return (
+        db.query(models.User)
+        .options(*profile_options(load))
+        .order_by(models.User.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def get_users_page(
+    db: Session,
+    after_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Sequence[str] = USER_FIELDS,
+    include: Sequence[str] = USER_INCLUDES
+) -> List[models.User]:
+    """
+    Get a page of users ordered by ID, loading only what will be serialized.
+
+    Args:
+        after_id: Keyset cursor; return users with a greater ID (preferred
+            over skip, which degrades on deep pages)
+        skip: Offset used when after_id is not given
+        limit: Maximum number of users
+        fields: Scalar columns to load (see USER_FIELDS)
+        include: Relationships to load with selectin (see USER_INCLUDES)
+    """
+    query = db.query(models.User).options(load_only(*[getattr(models.User, f) for f in fields]))
+    for name in include:
+        query = query.options(selectinload(getattr(models.User, name)))
+    query = query.order_by(models.User.id)
+    if after_id is not None:
+        query = query.filter(models.User.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def get_users_by_ids(db: Session, user_ids: List[int], load: str = "selectin") -> List[models.User]:
+    """Get users by ID, loading profile relationships with the given strategy."""
+    return (
+        db.query(models.User)
+        .options(*profile_options(load))
+        .filter(models.User.id.in_(user_ids))
+        .all()
+    )
+
+
+def search_users_by_skills(
+    db: Session,
+    predicates: List[Tuple[str, int]],
+    after_id: int = 0,
+    limit: int = 100
+) -> List[int]:
+    """
+    Find users having every skill at or above a minimum level.
+
+    The most demanding predicate is scanned in user_id order on
+    ix_skills_lname_user_id_level and every other predicate is intersected
+    as an EXISTS probe on the same index, so a page stops as soon as it has
+    `limit` matches instead of materializing every candidate.
+
+    Returns:
+        Matching user IDs greater than after_id, ascending
+    """
+    predicates = [(skill_vocabulary.canonicalize(db, name), level) for name, level in predicates]
+    ordered = sorted(predicates, key=lambda p: p[1], reverse=True)
+    name, min_level = ordered[0]
+    driver = models.Skill
+    statement = select(driver.user_id).where(
+        func.lower(driver.name) == name,
+        driver.user_id > after_id,
+        driver.level >= min_level
+    )
+    for name, min_level in ordered[1:]:
+        other = aliased(models.Skill)
+        statement = statement.where(
+            select(other.id).where(
+                func.lower(other.name) == name,
+                other.user_id == driver.user_id,
+                other.level >= min_level
+            ).exists()
+        )
+    statement = statement.distinct().order_by(driver.user_id).limit(limit)
+    return list(db.execute(statement).scalars())
 
 
 def create_skill(db: Session, skill: schemas.SkillCreate, user_id: int) -> models.Skill:
-    """Create a new skill for a user."""
-    db_skill = models.Skill(**skill.dict(), user_id=user_id)
+    """Create a new skill for a user, storing its canonical name."""
+    db_skill = models.Skill(
+        name=skill_vocabulary.canonicalize(db, skill.name),
+        level=skill.level,
+        user_id=user_id
+    )
     db.add(db_skill)
+    versions.bump(db, versions.user_key(user_id))
     db.commit()
     db.refresh(db_skill)
+    skill_index.add(user_id, db_skill.name, db_skill.level)
     return db_skill
 
 
@@ -47,8 +176,10 @@ def update_skill(db: Session, skill_id: int, skill_update: schemas.SkillUpdate)
     db_skill = get_skill(db, skill_id)
     if db_skill:
         db_skill.level = skill_update.level
+        versions.bump(db, versions.user_key(db_skill.user_id))
         db.commit()
         db.refresh(db_skill)
+        _sync_skill_index(db, db_skill.user_id, db_skill.name)
     return db_skill
 
 
@@ -56,49 +187,126 @@ def delete_skill(db: Session, skill_id: int) -> bool:
     """Delete a skill."""
     db_skill = get_skill(db, skill_id)
     if db_skill:
+        user_id, name = db_skill.user_id, db_skill.name
         db.delete(db_skill)
+        versions.bump(db, versions.user_key(user_id))
         db.commit()
+        _sync_skill_index(db, user_id, name)
         return True
     return False
 
 
+def _sync_skill_index(db: Session, user_id: int, name: str) -> None:
+    """Re-index a user's level for a skill from the rows left after a change."""
+    if not skill_index.loaded:
+        return
+    level = db.query(func.max(models.Skill.level)).filter(
+        models.Skill.user_id == user_id,
+        func.lower(models.Skill.name) == normalize_skill_name(name)
+    ).scalar()
+    skill_index.set(user_id, name, level)
+
+
+def get_skill_vocabulary(db: Session) -> List[models.CanonicalSkill]:
+    """Get every canonical skill with its aliases."""
+    return (
+        db.query(models.CanonicalSkill)
+        .options(selectinload(models.CanonicalSkill.aliases))
+        .order_by(models.CanonicalSkill.name)
+        .all()
+    )
+
+
+def get_alias_owners(db: Session, names: List[str]) -> Dict[str, str]:
+    """Map each normalized name that is already a canonical skill or alias to its canonical skill."""
+    keys = list({normalize_skill_key(name) for name in names})
+    owners = {
+        name: name
+        for (name,) in db.query(models.CanonicalSkill.name).filter(models.CanonicalSkill.name.in_(keys))
+    }
+    for alias, name in (
+        db.query(models.SkillAlias.alias, models.CanonicalSkill.name)
+        .join(models.SkillAlias.skill)
+        .filter(models.SkillAlias.alias.in_(keys))
+    ):
+        owners[alias] = name
+    return owners
+
+
+def create_canonical_skill(db: Session, entry: schemas.CanonicalSkillCreate) -> models.CanonicalSkill:
+    """Add a canonical skill, or extend an existing one, with normalized aliases."""
+    name = normalize_skill_key(entry.name)
+    db_skill = db.query(models.CanonicalSkill).filter(models.CanonicalSkill.name == name).first()
+    if db_skill is None:
+        db_skill = models.CanonicalSkill(name=name)
+        db.add(db_skill)
+    known = {alias.alias for alias in db_skill.aliases} | {name}
+    for alias in sorted({normalize_skill_key(alias) for alias in entry.aliases} - known):
+        db_skill.aliases.append(models.SkillAlias(alias=alias))
+    db.commit()
+    db.refresh(db_skill)
+    skill_vocabulary.clear()
+    return db_skill
+
+
+def canonical_requirements(db: Session, requirements: Dict[str, int]) -> Dict[str, int]:
+    """Rewrite requirement keys to canonical skill names, keeping the highest level on collisions."""
+    canonical: Dict[str, int] = {}
+    for skill, required in requirements.items():
+        name = skill_vocabulary.canonicalize(db, skill)
+        canonical[name] = max(canonical.get(name, 0), required)
+    return canonical
+
+
 def create_role(db: Session, role: schemas.RoleCreate) -> models.Role:
     """Create a new role."""
-    db_role = models.Role(name=role.name, requirements=role.requirements)
+    db_role = models.Role(name=role.name, requirements=canonical_requirements(db, role.requirements))
     db.add(db_role)
+    versions.bump(db, versions.CATALOG)
     db.commit()
     db.refresh(db_role)
+    catalog_cache.clear()
     return db_role
 
 
-def get_roles(db: Session) -> List[models.Role]:
-    """Get all roles."""
-    return db.query(models.Role).all()
+def get_roles(db: Session) -> List[RoleSnapshot]:
+    """Get all roles from the catalog cache."""
+    return list(catalog_cache.get(db).roles)
+
 
+def get_role_by_name(db: Session, name: str) -> Optional[RoleSnapshot]:
+    """Get role by name from the catalog cache."""
+    return catalog_cache.get(db).roles_by_name.get(name)
 
-def get_role_by_name(db: Session, name: str) -> Optional[models.Role]:
-    """Get role by name."""
-    return db.query(models.Role).filter(models.Role.name == name).first()
+
+def get_roles_by_names(db: Session, names: List[str]) -> List[RoleSnapshot]:
+    """Get roles matching any of the given names from the catalog cache."""
+    roles_by_name = catalog_cache.get(db).roles_by_name
+    return [roles_by_name[name] for name in names if name in roles_by_name]
 
 
 def create_course(db: Session, course: schemas.CourseCreate) -> models.Course:
     """Create a new course."""
     db_course = models.Course(**course.dict())
     db.add(db_course)
+    versions.bump(db, versions.CATALOG)
     db.commit()
     db.refresh(db_course)
+    catalog_cache.clear()
+    course_index.add(db_course)
     return db_course
 
 
-def get_courses(db: Session) -> List[models.Course]:
-    """Get all courses."""
-    return db.query(models.Course).all()
+def get_courses(db: Session) -> List[CourseSnapshot]:
+    """Get all courses from the catalog cache."""
+    return list(catalog_cache.get(db).courses)
 
 
 def create_certification(db: Session, certification: schemas.CertificationCreate, user_id: int) -> models.Certification:
     """Create a new certification for a user."""
     db_cert = models.Certification(**certification.dict(), user_id=user_id)
     db.add(db_cert)
+    versions.bump(db, versions.user_key(user_id))
     db.commit()
     db.refresh(db_cert)
     return db_cert
@@ -114,6 +322,7 @@ def delete_certification(db: Session, certification_id: int) -> bool:
     db_cert = get_certification(db, certification_id)
     if db_cert:
         db.delete(db_cert)
+        versions.bump(db, versions.user_key(db_cert.user_id))
         db.commit()
         return True
     return False
@@ -123,6 +332,7 @@ def create_achievement(db: Session, achievement: schemas.AchievementCreate, user
     """Create a new achievement for a user."""
     db_achievement = models.Achievement(**achievement.dict(), user_id=user_id)
     db.add(db_achievement)
+    versions.bump(db, versions.user_key(user_id))
     db.commit()
     db.refresh(db_achievement)
     return db_achievement
@@ -138,6 +348,148 @@ def delete_achievement(db: Session, achievement_id: int) -> bool:
     db_achievement = get_achievement(db, achievement_id)
     if db_achievement:
         db.delete(db_achievement)
+        versions.bump(db, versions.user_key(db_achievement.user_id))
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+
+def _chunks(items: list, size: int = BULK_BATCH_SIZE):
+    """Yield successive slices of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_write(
+    db: Session,
+    model: type,
+    rows: List[Tuple[int, Hashable, Dict[str, Any]]],
+    existing: Dict[Hashable, int],
+    upsert: bool,
+    atomic: bool,
+    bump: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """
+    Insert new rows and update existing ones in batched executemany statements.
+
+    Args:
+        db: Database session
+        model: Model class to write
+        rows: (row_number, natural key, column values) per input row; later
+            rows with the same key win
+        existing: Natural key to primary key of rows already in the table
+        upsert: Update existing rows; otherwise report them as errors
+        atomic: Roll back everything if any row has an error
+        bump: Versions to increment in the same transaction if anything is written
+
+    Returns:
+        Counts of inserted and updated rows and per-row errors
+    """
+    inserts: Dict[Hashable, Dict[str, Any]] = {}
+    updates: Dict[Hashable, Dict[str, Any]] = {}
+    errors = []
+    for row_number, key, values in rows:
+        if key in existing:
+            if not upsert:
+                errors.append({"row": row_number, "error": "Already exists"})
+                continue
+            updates[key] = dict(values, id=existing[key])
+        else:
+            inserts[key] = values
+
+    if errors and atomic:
+        return {"inserted": 0, "updated": 0, "errors": errors}
+
+    for batch in _chunks(list(inserts.values())):
+        db.execute(insert(model), batch)
+    for batch in _chunks(list(updates.values())):
+        db.execute(update(model), batch)
+    if inserts or updates:
+        versions.bump(db, *bump)
+    db.commit()
+    return {"inserted": len(inserts), "updated": len(updates), "errors": errors}
+
+
+def bulk_upsert_skills(
+    db: Session,
+    skills: List[Tuple[int, schemas.SkillBulkCreate]],
+    upsert: bool = True,
+    atomic: bool = False
+) -> Dict[str, Any]:
+    """Insert or update skills for many users, keyed by user and canonical skill name."""
+    user_ids = list({skill.user_id for _, skill in skills})
+    known_users = set()
+    existing = {}
+    for batch in _chunks(user_ids, 500):
+        known_users.update(
+            user_id for (user_id,) in db.query(models.User.id).filter(models.User.id.in_(batch))
+        )
+        for skill_id, user_id, name in (
+            db.query(models.Skill.id, models.Skill.user_id, models.Skill.name)
+            .filter(models.Skill.user_id.in_(batch))
+        ):
+            existing[(user_id, skill_vocabulary.canonicalize(db, name))] = skill_id
+
+    rows = []
+    errors = []
+    for row_number, skill in skills:
+        if skill.user_id not in known_users:
+            errors.append({"row": row_number, "error": "User not found"})
+            continue
+        key = (skill.user_id, skill_vocabulary.canonicalize(db, skill.name))
+        values = {"level": skill.level} if key in existing else dict(skill.model_dump(), name=key[1])
+        rows.append((row_number, key, values))
+
+    if errors and atomic:
+        return {"inserted": 0, "updated": 0, "errors": errors}
+    user_keys = sorted({versions.user_key(user_id) for _, (user_id, _), _ in rows})
+    result = _bulk_write(db, models.Skill, rows, existing, upsert, atomic, bump=user_keys)
+    if skill_index.loaded:
+        if result["updated"]:
+            for _, (user_id, name), values in rows:
+                if (user_id, name) in existing:
+                    skill_index.set(user_id, name, values["level"])
+        skill_index.refresh(db)
+    result["errors"] = sorted(errors + result["errors"], key=lambda e: e["row"])
+    return result
+
+
+def bulk_upsert_courses(
+    db: Session,
+    courses: List[Tuple[int, schemas.CourseCreate]],
+    upsert: bool = True,
+    atomic: bool = False
+) -> Dict[str, Any]:
+    """Insert or update courses keyed by title."""
+    titles = list({course.title for _, course in courses})
+    existing = {}
+    for batch in _chunks(titles, 500):
+        for course_id, title in db.query(models.Course.id, models.Course.title).filter(models.Course.title.in_(batch)):
+            existing[title] = course_id
+
+    rows = [(row_number, course.title, course.model_dump()) for row_number, course in courses]
+    result = _bulk_write(db, models.Course, rows, existing, upsert, atomic, bump=[versions.CATALOG])
+    catalog_cache.clear()
+    return result
+
+
+def bulk_upsert_roles(
+    db: Session,
+    roles: List[Tuple[int, schemas.RoleCreate]],
+    upsert: bool = True,
+    atomic: bool = False
+) -> Dict[str, Any]:
+    """Insert or update roles keyed by name."""
+    names = list({role.name for _, role in roles})
+    existing = {}
+    for batch in _chunks(names, 500):
+        for role_id, name in db.query(models.Role.id, models.Role.name).filter(models.Role.name.in_(batch)):
+            existing[name] = role_id
+
+    rows = [
+        (row_number, role.name, dict(role.model_dump(), requirements=canonical_requirements(db, role.requirements)))
+        for row_number, role in roles
+    ]
+    result = _bulk_write(db, models.Role, rows, existing, upsert, atomic, bump=[versions.CATALOG])
+    catalog_cache.clear()
+    return result
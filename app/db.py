@@ -1,6 +1,8 @@
 """Database configuration and session management."""
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Any
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -8,19 +10,68 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
+# Optional separate URL for read-only sessions (e.g. a replica)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", DATABASE_URL)
+# "production" applies the SQLite pragmas below on every connection
+DB_PROFILE = os.getenv("DB_PROFILE", "development")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+
+
+def _is_sqlite(url: str) -> bool:
+    """Whether a database URL points at SQLite."""
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    """Whether a database URL points at an in-memory SQLite database."""
+    return _is_sqlite(url) and (url in ("sqlite://", "sqlite:///") or ":memory:" in url)
+
+
+def _create_engine(url: str):
+    """Create an engine with SQLite connect arguments where needed."""
+    connect_args = {}
+    if _is_sqlite(url):
+        connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    return create_engine(url, connect_args=connect_args)
+
+
+def _set_pragmas(target_engine, pragmas: Dict[str, Any]) -> None:
+    """Run PRAGMA statements on every new connection of an engine."""
+    @event.listens_for(target_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+engine = _create_engine(DATABASE_URL)
+# An in-memory database only exists on its own engine, so reads share it
+read_engine = engine if _is_sqlite_memory(DATABASE_URL) else _create_engine(DATABASE_READ_URL)
+
+if _is_sqlite(DATABASE_URL):
+    pragmas = dict(SQLITE_PRODUCTION_PRAGMAS) if DB_PROFILE == "production" else {}
+    _set_pragmas(engine, pragmas)
+    if read_engine is not engine:
+        # query_only makes accidental writes through a read session fail
+        _set_pragmas(read_engine, dict(pragmas, query_only="ON"))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
 
 def get_db():
-    """Dependency for getting database session."""
+    """Dependency for getting a read-write database session."""
     db = SessionLocal()
     try:
         yield db
@@ -28,6 +79,37 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency for getting a read-only database session."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def init_db():
     """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """
+    Record every SQL statement executed on the engine inside the block.
+
+    Yields the list of statements, which grows as queries run.
+    """
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = {engine, read_engine}
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
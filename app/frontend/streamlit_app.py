@@ -1,7 +1,8 @@
 """Streamlit frontend for Skill Manager."""
+import json
 import streamlit as st
 import requests
-from typing import Optional
+from typing import Optional, Iterator, Tuple, Any
 
 # Page config
 st.set_page_config(
@@ -20,11 +21,19 @@ if "user_data" not in st.session_state:
 
 
 def api_call(method: str, endpoint: str, data: Optional[dict] = None):
-    """Make API call to backend."""
+    """Make API call to backend, revalidating cached GET responses by ETag."""
     url = f"{st.session_state.backend_url}{endpoint}"
+    etag_cache = st.session_state.setdefault("etag_cache", {})
     try:
         if method == "GET":
-            response = requests.get(url)
+            cached = etag_cache.get(url)
+            headers = {"If-None-Match": cached[0]} if cached else {}
+            response = requests.get(url, headers=headers)
+            if response.status_code == 304 and cached:
+                return cached[1]
+            if response.ok and "ETag" in response.headers:
+                etag_cache[url] = (response.headers["ETag"], response.json())
+                return etag_cache[url][1]
         elif method == "POST":
             response = requests.post(url, json=data)
         elif method == "PUT":
@@ -39,6 +48,73 @@ def api_call(method: str, endpoint: str, data: Optional[dict] = None):
         return None
 
 
+def api_stream(endpoint: str, data: dict) -> Iterator[Tuple[str, Any]]:
+    """POST to a Server-Sent Events endpoint and yield (event, data) pairs."""
+    url = f"{st.session_state.backend_url}{endpoint}"
+    try:
+        with requests.post(url, json=data, stream=True) as response:
+            response.raise_for_status()
+            if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                yield "done", response.json()
+                return
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    yield event, json.loads(line[6:])
+                    event = "message"
+    except Exception as e:
+        st.error(f"API Error: {str(e)}")
+
+
+def render_analysis(analysis: dict):
+    """Render fit score, assessment, missing and underdeveloped skills."""
+    # Fit score
+    fit_score = analysis.get("fit_score", 0)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Overall Fit Score", f"{fit_score}%")
+    with col2:
+        if analysis.get("overall_assessment"):
+            st.info(f"**Assessment:** {analysis['overall_assessment']}")
+
+    # Missing skills
+    if analysis.get("missing"):
+        st.warning("**Missing Skills:**")
+        for skill in analysis["missing"]:
+            st.write(f"- {skill}")
+
+    # Underdeveloped skills
+    if analysis.get("underdeveloped"):
+        st.warning("**Skills to Improve:**")
+        for skill in analysis["underdeveloped"]:
+            st.write(
+                f"- {skill['skill']}: Level {skill['user_level']} → "
+                f"{skill['required']} (Gap: {skill['severity']})"
+            )
+
+
+def render_recommendations(recommendations: list):
+    """Render recommended courses."""
+    st.subheader("📚 Recommended Courses")
+    if recommendations:
+        for rec in recommendations:
+            with st.expander(f"📖 {rec['title']}"):
+                st.write(f"**Provider:** {rec['provider']}")
+                st.write(f"**Level:** {rec['level']}")
+                st.write(f"**Skill:** {rec['related_skill']}")
+                st.write(f"**Why:** {rec['reason']}")
+    else:
+        st.success("Great! You're well-prepared for this role.")
+
+
+def render_study_plan(study_plan: str):
+    """Render the study plan."""
+    st.subheader("📅 Personalized Study Plan")
+    st.info(study_plan)
+
+
 def main():
     """Main application."""
     st.title("🎯 AI-Powered Skill Manager")
@@ -242,63 +318,56 @@ def main():
                 if use_custom:
                     selected_role = st.text_input("Custom Role Name", value="Machine Learning Engineer")
                 
+                mode = st.radio(
+                    "Analysis Mode",
+                    ["ai", "hybrid", "fast"],
+                    horizontal=True,
+                    help="fast: computed locally from role requirements; hybrid: local analysis with an AI-written plan; ai: full AI analysis"
+                )
+
                 if st.button("🔍 Analyze Skill Gap", type="primary"):
-                    with st.spinner("AI is analyzing your complete profile..."):
-                        result = api_call(
-                            "POST",
-                            "/analysis/",
-                            {"user_id": user["id"], "role": selected_role}
-                        )
-                        
-                        if result:
-                            if "error" in result:
-                                st.error(result["error"])
-                            else:
-                                # Display analysis
-                                st.success("Analysis Complete!")
-                                
-                                analysis = result.get("analysis", {})
-                                
-                                # Fit score
-                                fit_score = analysis.get("fit_score", 0)
-                                col1, col2 = st.columns(2)
-                                with col1:
-                                    st.metric("Overall Fit Score", f"{fit_score}%")
-                                with col2:
-                                    if analysis.get("overall_assessment"):
-                                        st.info(f"**Assessment:** {analysis['overall_assessment']}")
-                                
-                                # Missing skills
-                                if analysis.get("missing"):
-                                    st.warning("**Missing Skills:**")
-                                    for skill in analysis["missing"]:
-                                        st.write(f"- {skill}")
-                                
-                                # Underdeveloped skills
-                                if analysis.get("underdeveloped"):
-                                    st.warning("**Skills to Improve:**")
-                                    for skill in analysis["underdeveloped"]:
-                                        st.write(
-                                            f"- {skill['skill']}: Level {skill['user_level']} → "
-                                            f"{skill['required']} (Gap: {skill['severity']})"
-                                        )
-                                
-                                # Recommendations
-                                st.subheader("📚 Recommended Courses")
-                                recommendations = result.get("recommendations", [])
-                                if recommendations:
-                                    for rec in recommendations:
-                                        with st.expander(f"📖 {rec['title']}"):
-                                            st.write(f"**Provider:** {rec['provider']}")
-                                            st.write(f"**Level:** {rec['level']}")
-                                            st.write(f"**Skill:** {rec['related_skill']}")
-                                            st.write(f"**Why:** {rec['reason']}")
-                                else:
-                                    st.success("Great! You're well-prepared for this role.")
-                                
-                                # Study plan
-                                st.subheader("📅 Personalized Study Plan")
-                                st.info(result.get("study_plan", ""))
+                    status = st.empty()
+                    progress = st.empty()
+                    analysis_area = st.empty()
+                    recommendations_area = st.empty()
+                    study_plan_area = st.empty()
+                    analysis = {}
+                    received = 0
+
+                    status.info("AI is analyzing your complete profile...")
+                    for event, data in api_stream(
+                        f"/analysis/stream?mode={mode}",
+                        {"user_id": user["id"], "role": selected_role}
+                    ):
+                        if event == "token":
+                            received += len(data["text"])
+                            progress.caption(f"Receiving analysis... {received} characters")
+                        elif event == "section":
+                            if data["name"] == "analysis":
+                                analysis = data["value"]
+                            elif data["name"] == "overall_assessment":
+                                analysis["overall_assessment"] = data["value"]
+                            if data["name"] in ("analysis", "overall_assessment"):
+                                with analysis_area.container():
+                                    render_analysis(analysis)
+                            elif data["name"] == "recommendations":
+                                with recommendations_area.container():
+                                    render_recommendations(data["value"])
+                            elif data["name"] == "study_plan":
+                                with study_plan_area.container():
+                                    render_study_plan(data["value"])
+                        elif event == "error" or (event == "done" and "error" in data):
+                            status.error(data["error"])
+                        elif event == "done":
+                            # Redraw from the final result in case a section was not streamed
+                            with analysis_area.container():
+                                render_analysis(data.get("analysis", {}))
+                            with recommendations_area.container():
+                                render_recommendations(data.get("recommendations", []))
+                            with study_plan_area.container():
+                                render_study_plan(data.get("study_plan", ""))
+                            status.success("Analysis Complete!")
+                    progress.empty()
 
         # Tab 4: Self-Assessment
         with tab4:
@@ -342,7 +411,7 @@ def main():
                         result = api_call(
                             "POST",
                             f"/quiz/{st.session_state.quiz_skill}/submit",
-                            {"answers": answers}
+                            {"answers": answers, "attempt_id": quiz.get("attempt_id")}
                         )
                         
                         if result:
@@ -0,0 +1,167 @@
+"""Deterministic skill gap analysis computed from role requirements."""
+from typing import Dict, List, Any
+
+# Course level best suited to lift a skill from a given current level
+COURSE_LEVEL_FOR_USER_LEVEL = {
+    0: "beginner",
+    1: "beginner",
+    2: "intermediate",
+    3: "intermediate",
+    4: "advanced",
+    5: "advanced",
+}
+COURSE_LEVEL_ORDER = ["beginner", "intermediate", "advanced"]
+
+
+def normalize_skill_name(name: str) -> str:
+    """Normalize a skill name for comparison."""
+    return name.strip().lower()
+
+
+def compute_gap(user_skills: List[Dict[str, Any]], requirements: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Compare user skills against role requirements.
+
+    Args:
+        user_skills: List of user's current skills with levels
+        requirements: Role requirement map of skill name to required level
+
+    Returns:
+        Analysis block with missing, underdeveloped and fit_score
+    """
+    levels: Dict[str, int] = {}
+    for skill in user_skills:
+        key = normalize_skill_name(skill["name"])
+        levels[key] = max(levels.get(key, 0), skill["level"])
+
+    missing = []
+    underdeveloped = []
+    earned = 0
+    total = 0
+    for skill, required in requirements.items():
+        user_level = levels.get(normalize_skill_name(skill), 0)
+        total += required
+        earned += min(user_level, required)
+        if user_level == 0:
+            missing.append(skill)
+        elif user_level < required:
+            underdeveloped.append({
+                "skill": skill,
+                "user_level": user_level,
+                "required": required,
+                "severity": required - user_level
+            })
+
+    underdeveloped.sort(key=lambda item: item["severity"], reverse=True)
+    fit_score = round(100 * earned / total) if total else 100
+
+    return {
+        "missing": missing,
+        "underdeveloped": underdeveloped,
+        "fit_score": fit_score
+    }
+
+
+def _pick_course(courses: List[Dict[str, str]], user_level: int) -> Dict[str, str]:
+    """Pick the course whose level best matches the user's current level."""
+    target = COURSE_LEVEL_ORDER.index(COURSE_LEVEL_FOR_USER_LEVEL.get(user_level, "advanced"))
+
+    def distance(course: Dict[str, str]) -> int:
+        level = course["level"].lower()
+        rank = COURSE_LEVEL_ORDER.index(level) if level in COURSE_LEVEL_ORDER else len(COURSE_LEVEL_ORDER)
+        return abs(rank - target)
+
+    return min(courses, key=distance)
+
+
+def recommend_courses(
+    analysis: Dict[str, Any],
+    requirements: Dict[str, int],
+    course_catalog: List[Dict[str, str]]
+) -> List[Dict[str, str]]:
+    """
+    Recommend one catalog course per missing or underdeveloped skill.
+
+    Args:
+        analysis: Analysis block produced by compute_gap
+        requirements: Role requirement map of skill name to required level
+        course_catalog: Available courses
+
+    Returns:
+        Course recommendations with a reason for each
+    """
+    by_skill: Dict[str, List[Dict[str, str]]] = {}
+    for course in course_catalog:
+        by_skill.setdefault(normalize_skill_name(course["related_skill"]), []).append(course)
+
+    gaps = [(skill, 0, requirements[skill]) for skill in analysis["missing"]]
+    gaps += [(u["skill"], u["user_level"], u["required"]) for u in analysis["underdeveloped"]]
+
+    recommendations = []
+    for skill, user_level, required in gaps:
+        courses = by_skill.get(normalize_skill_name(skill))
+        if not courses:
+            continue
+        course = _pick_course(courses, user_level)
+        if user_level == 0:
+            reason = f"Builds the missing {skill} skill required at level {required}"
+        else:
+            reason = f"Raises {skill} from level {user_level} towards the required level {required}"
+        recommendations.append({
+            "title": course["title"],
+            "provider": course["provider"],
+            "level": course["level"],
+            "related_skill": course["related_skill"],
+            "reason": reason
+        })
+    return recommendations
+
+
+def build_assessment(analysis: Dict[str, Any], target_role: str) -> str:
+    """Summarize the analysis block in one sentence."""
+    gap_count = len(analysis["missing"]) + len(analysis["underdeveloped"])
+    if gap_count == 0:
+        return f"Meets every skill requirement for {target_role}."
+    return (
+        f"{analysis['fit_score']}% fit for {target_role} with "
+        f"{len(analysis['missing'])} missing and {len(analysis['underdeveloped'])} underdeveloped skills."
+    )
+
+
+def build_study_plan(recommendations: List[Dict[str, str]]) -> str:
+    """Lay out recommended courses as a two-weeks-per-course plan."""
+    if not recommendations:
+        return "No study needed for the required skills. Keep practicing to maintain your levels."
+    steps = []
+    for i, rec in enumerate(recommendations):
+        steps.append(f"Week {2 * i + 1}-{2 * i + 2}: {rec['title']} ({rec['related_skill']})")
+    return ". ".join(steps) + "."
+
+
+def analyze(
+    user_skills: List[Dict[str, Any]],
+    requirements: Dict[str, int],
+    target_role: str,
+    course_catalog: List[Dict[str, str]]
+) -> Dict[str, Any]:
+    """
+    Generate a complete skill gap analysis without calling the LLM.
+
+    Args:
+        user_skills: List of user's current skills with levels
+        requirements: Role requirement map of skill name to required level
+        target_role: Target job role name
+        course_catalog: Available courses
+
+    Returns:
+        Analysis results in the same shape as the AI analysis
+    """
+    analysis = compute_gap(user_skills, requirements)
+    analysis["overall_assessment"] = build_assessment(analysis, target_role)
+    recommendations = recommend_courses(analysis, requirements, course_catalog)
+    return {
+        "analysis": analysis,
+        "recommendations": recommendations,
+        "study_plan": build_study_plan(recommendations),
+        "ai_used": False
+    }
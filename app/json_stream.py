@@ -0,0 +1,204 @@
+"""Incremental parsing, extraction and repair of JSON model output."""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# "{" positions tried as the start of the object when output has leading prose
+MAX_OBJECT_STARTS = 8
+
+
+class SectionParser:
+    """
+    Emit top-level members of a JSON object as soon as each one is complete.
+
+    Text is fed in arbitrary chunks (e.g. streamed model tokens). Anything
+    before the first "{" such as a markdown fence is ignored.
+    """
+
+    def __init__(self):
+        """Initialize scanner state."""
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.state = "start"  # start, key, colon, value, done
+        self.string_start = 0
+        self.key = None
+        self.value_start = 0
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Add text and return newly completed (key, value) sections.
+
+        Args:
+            text: Next chunk of model output
+
+        Returns:
+            Sections whose values became parseable with this chunk
+        """
+        self.buffer += text
+        sections = []
+        while self.pos < len(self.buffer) and self.state != "done":
+            i = self.pos
+            char = self.buffer[i]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.state == "key":
+                        self.key = json.loads(self.buffer[self.string_start:i + 1])
+                        self.state = "colon"
+                continue
+
+            if self.state == "start":
+                if char == "{":
+                    self.depth = 1
+                    self.state = "key"
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = i
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    if self.state == "value":
+                        sections.append(self._section(i))
+                    self.state = "done"
+            elif self.depth == 1:
+                if char == ":" and self.state == "colon":
+                    self.state = "value"
+                    self.value_start = i + 1
+                elif char == "," and self.state == "value":
+                    sections.append(self._section(i))
+                    self.state = "key"
+        return [section for section in sections if section is not None]
+
+    def _section(self, end: int) -> Optional[Tuple[str, Any]]:
+        """Parse the current value ending at end, or None if it is not valid JSON."""
+        try:
+            return self.key, json.loads(self.buffer[self.value_start:end])
+        except ValueError:
+            return None
+
+    @property
+    def done(self) -> bool:
+        """Whether the top-level object has been closed."""
+        return self.state == "done"
+
+
+# Kinds of repair reported by extract_json
+SYNTAX, TRUNCATED = "syntax", "truncated"
+
+# Closing character of each bracket
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def _repair_from(text: str, start: int) -> Tuple[Any, bool]:
+    """
+    Parse the JSON object starting at text[start], repairing it on the way.
+
+    Trailing commas are dropped and raw control characters inside strings
+    are escaped. If the text ends before the object does (e.g. the model
+    hit max_tokens), the open string is closed and the open brackets are
+    closed after the last complete member; a partial member is dropped.
+
+    Returns:
+        (value, truncated) where truncated tells whether the object was cut off
+
+    Raises:
+        ValueError: If no repair parses
+    """
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    # (output length, open brackets) at points where the output can be cut and closed
+    cuts = []
+    for char in text[start:]:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            elif char < " ":
+                char = json.dumps(char)[1:-1]
+            out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+            cuts.append((len(out), list(stack)))
+            continue
+        elif char in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            if not stack or CLOSERS[stack.pop()] != char:
+                raise ValueError("Mismatched bracket in model output")
+            out.append(char)
+            if not stack:
+                return json.loads("".join(out)), False
+            cuts.append((len(out), list(stack)))
+            continue
+        elif char == ",":
+            cuts.append((len(out), list(stack)))
+        out.append(char)
+
+    # Truncated: close the open string, then try cut points from the latest back
+    if escape:
+        out.pop()
+    tail = "".join(out) + ('"' if in_string else "")
+    candidates = [(tail.rstrip().rstrip(","), stack)]
+    candidates += [("".join(out[:length]).rstrip().rstrip(","), opened) for length, opened in reversed(cuts)]
+    for body, opened in candidates:
+        try:
+            return json.loads(body + "".join(CLOSERS[bracket] for bracket in reversed(opened))), True
+        except ValueError:
+            continue
+    raise ValueError("Model output could not be repaired into JSON")
+
+
+def extract_json(text: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Find the JSON object in model output, repairing it if needed.
+
+    Leading prose, markdown fences and anything after the object are
+    skipped. Output that doesn't parse as is goes through the repair in
+    _repair_from (trailing commas, unterminated strings and brackets).
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        (object, repair) where repair is None for output that parsed as is,
+        "syntax" if it had to be fixed and "truncated" if it was cut off
+
+    Raises:
+        ValueError: If no JSON object can be found or repaired
+    """
+    decoder = json.JSONDecoder()
+    starts = [i for i, char in enumerate(text) if char == "{"][:MAX_OBJECT_STARTS]
+    for start in starts:
+        try:
+            value, repair = decoder.raw_decode(text, start)[0], None
+        except ValueError:
+            try:
+                value, truncated = _repair_from(text, start)
+            except ValueError:
+                continue
+            repair = TRUNCATED if truncated else SYNTAX
+        if isinstance(value, dict) and value:
+            return value, repair
+    raise ValueError("No JSON object found in model output")
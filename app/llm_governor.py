@@ -0,0 +1,411 @@
+"""Rate limiting, retries, timeouts and circuit breaking for outbound LLM calls."""
+import os
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, Iterator
+from dotenv import load_dotenv
+from app import metrics
+from app.llm_providers import Completion, LLMError, estimate_tokens
+
+load_dotenv()
+
+# Circuit breaker states, as reported by the llm_circuit_state gauge
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# 4xx statuses worth retrying; other client errors would fail again
+RETRYABLE_CLIENT_ERRORS = {408, 409, 429}
+
+llm_retries = metrics.registry.register(metrics.Counter(
+    "llm_retries_total", "LLM call attempts retried, by failure reason.", ("model", "reason")
+))
+llm_rejections = metrics.registry.register(metrics.Counter(
+    "llm_circuit_rejections_total", "LLM calls failed fast because the circuit was open.", ("model",)
+))
+llm_circuit_state = metrics.registry.register(metrics.Gauge(
+    "llm_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("model",)
+))
+llm_throttle_wait = metrics.registry.register(metrics.Counter(
+    "llm_rate_limit_wait_seconds_total", "Time LLM calls spent waiting for rate limit capacity.", ("model",)
+))
+llm_bucket_level = metrics.registry.register(metrics.Gauge(
+    "llm_rate_limit_available", "Capacity left in the rate limit buckets (requests or tokens).", ("bucket",)
+))
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    Callers reserve capacity up front and are told how long to wait, so
+    concurrent callers queue in arrival order instead of polling. The
+    level may go negative while reservations are outstanding. pause()
+    holds every caller back, e.g. for a provider's Retry-After.
+    """
+
+    def __init__(self, per_minute: float):
+        """Initialize a full bucket; per_minute <= 0 disables limiting."""
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Add capacity for the time elapsed; caller holds the lock."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self.paused_until - now
+            if self.per_minute > 0:
+                self._refill(now)
+                self.level -= min(amount, self.capacity)
+                if self.level < 0:
+                    wait = max(wait, -self.level / self.rate)
+            return max(0.0, wait)
+
+    def refund(self, amount: float) -> None:
+        """Return capacity that a call reserved but did not use."""
+        if self.per_minute <= 0 or amount <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every reservation for the next seconds, even with limiting disabled."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def available(self) -> float:
+        """Current level (negative while callers are queued)."""
+        if self.per_minute <= 0:
+            return float("inf")
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.level
+
+
+class LLMGovernor:
+    """
+    Gate for every outbound LLM call, shared by the sync and async clients.
+
+    Each call:
+    - passes the circuit breaker;
+    - reserves one request and its estimated tokens (prompt plus
+      max_tokens) from the per-minute buckets;
+    - runs with a timeout (enforced here for async calls and by the
+      provider's HTTP client for sync ones).
+
+    Timeouts, connection errors, 429s and 5xx responses are retried with
+    full-jitter exponential backoff. A 429's Retry-After is honored and
+    pauses all callers, not just the one that was limited.
+
+    After breaker_failures consecutive failed attempts the circuit opens.
+    Calls then fail fast with CircuitOpenError for breaker_cooldown
+    seconds, after which one probe call is let through to close it again.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_retry_after: float = 30.0,
+        timeout: float = 30.0,
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 30.0
+    ):
+        """
+        Args:
+            requests_per_minute: Request quota; 0 disables the limit
+            tokens_per_minute: Token quota (prompt + completion); 0 disables it
+            max_retries: Retries after the first attempt
+            base_delay: Backoff cap of the first retry, doubled for each retry
+            max_delay: Upper bound of the backoff cap
+            max_retry_after: Longest Retry-After to wait out before giving up
+            timeout: Seconds per attempt (async calls; per chunk for streams)
+            breaker_failures: Consecutive failed attempts that open the circuit
+            breaker_cooldown: Seconds the circuit stays open before a probe
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "throttled_seconds": 0.0}
+
+    def _set_state(self, state: str, model: str) -> None:
+        """Move the breaker to a state; caller holds the lock."""
+        self.state = state
+        llm_circuit_state.set(STATE_VALUES[state], model=model)
+
+    def _admit(self, model: str) -> None:
+        """Let a call through the breaker or raise CircuitOpenError."""
+        with self._lock:
+            self.stats["calls"] += 1
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.breaker_cooldown:
+                self._set_state(HALF_OPEN, model)
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._probing):
+                self._probing = self.state == HALF_OPEN
+                return
+            self.stats["rejected"] += 1
+            remaining = max(0.0, self.breaker_cooldown - (time.monotonic() - self.opened_at))
+        llm_rejections.inc(model=model)
+        raise CircuitOpenError("LLM circuit breaker is open", status_code=503, retry_after=remaining)
+
+    def _record(self, model: str, failed: bool) -> None:
+        """Update the breaker with an attempt's outcome."""
+        with self._lock:
+            self._probing = False
+            if not failed:
+                self.failures = 0
+                if self.state != CLOSED:
+                    self._set_state(CLOSED, model)
+                return
+            self.failures += 1
+            self.stats["failures"] += 1
+            if self.state == HALF_OPEN or self.failures >= self.breaker_failures:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN, model)
+
+    @contextmanager
+    def _attempt(self, model: str) -> Iterator[None]:
+        """
+        Report one attempt's outcome to the breaker, raising timeouts as LLMError.
+
+        Client errors (non-retryable 4xx) don't count as failures: the
+        provider answered. Cancelled attempts only free the probe slot.
+        """
+        try:
+            yield
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            # Separate classes before Python 3.11
+            self._record(model, failed=True)
+            raise LLMError(f"LLM call timed out after {self.timeout}s") from e
+        except LLMError as e:
+            self._record(model, failed=self.retryable(e))
+            raise
+        except Exception:
+            self._record(model, failed=True)
+            raise
+        except BaseException:
+            with self._lock:
+                self._probing = False
+            raise
+        else:
+            self._record(model, failed=False)
+
+    def _reserve(self, prompt: str, max_tokens: int, model: str) -> float:
+        """Reserve a request and its worst-case tokens; return the seconds to wait."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimate_tokens(prompt) + max_tokens))
+        if wait > 0:
+            with self._lock:
+                self.stats["throttled_seconds"] += wait
+            llm_throttle_wait.inc(wait, model=model)
+        return wait
+
+    def _settle(self, prompt: str, max_tokens: int, completion: Optional[Completion]) -> None:
+        """Refund reserved tokens the call did not use."""
+        if completion is not None and completion.usage is not None:
+            used = completion.usage.prompt_tokens + completion.usage.completion_tokens
+            self.tokens.refund(estimate_tokens(prompt) + max_tokens - used)
+
+    @staticmethod
+    def retryable(error: LLMError) -> bool:
+        """Whether an error is transient: no status, a retryable 4xx or a 5xx."""
+        return error.status_code is None or error.status_code in RETRYABLE_CLIENT_ERRORS or error.status_code >= 500
+
+    def _retry_delay(self, error: LLMError, attempt: int, model: str) -> Optional[float]:
+        """Seconds to wait before retrying after a failed attempt, or None to give up."""
+        if isinstance(error, CircuitOpenError) or not self.retryable(error) or attempt >= self.max_retries:
+            return None
+        if self.state == OPEN:
+            return None
+        if error.retry_after is not None:
+            if error.retry_after > self.max_retry_after:
+                return None
+            # Everyone waits out the provider's limit, not just this caller
+            self.requests.pause(error.retry_after)
+            delay = error.retry_after + random.uniform(0, 0.1 * error.retry_after + 0.05)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        with self._lock:
+            self.stats["retries"] += 1
+        llm_retries.inc(model=model, reason=str(error.status_code or "error"))
+        return delay
+
+    def call(self, model: str, prompt: str, max_tokens: int, attempt_call: Callable[[], Completion]) -> Completion:
+        """Run a blocking completion under the governor."""
+        for attempt in range(self.max_retries + 1):
+            self._admit(model)
+            time.sleep(self._reserve(prompt, max_tokens, model))
+            try:
+                with self._attempt(model):
+                    completion = attempt_call()
+            except LLMError as e:
+                delay = self._retry_delay(e, attempt, model)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._settle(prompt, max_tokens, completion)
+            return completion
+
+    async def acall(
+        self, model: str, prompt: str, max_tokens: int, attempt_call: Callable[[], Awaitable[Completion]]
+    ) -> Completion:
+        """Run a non-blocking completion under the governor, with a per-attempt timeout."""
+        for attempt in range(self.max_retries + 1):
+            self._admit(model)
+            await asyncio.sleep(self._reserve(prompt, max_tokens, model))
+            try:
+                with self._attempt(model):
+                    completion = await asyncio.wait_for(attempt_call(), self.timeout)
+            except LLMError as e:
+                delay = self._retry_delay(e, attempt, model)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._settle(prompt, max_tokens, completion)
+            return completion
+
+    async def astream(
+        self, model: str, prompt: str, max_tokens: int, attempt_stream: Callable[[], AsyncIterator[Completion]]
+    ) -> AsyncIterator[Completion]:
+        """
+        Run a streamed completion under the governor.
+
+        Attempts are retried only until the first delta has been passed on;
+        the timeout applies to the wait for each delta.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._admit(model)
+            await asyncio.sleep(self._reserve(prompt, max_tokens, model))
+            started = False
+            content, usage = [], None
+            try:
+                with self._attempt(model):
+                    stream = attempt_stream().__aiter__()
+                    while True:
+                        try:
+                            delta = await asyncio.wait_for(stream.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        started = True
+                        content.append(delta.content)
+                        usage = delta.usage or usage
+                        yield delta
+            except LLMError as e:
+                delay = None if started else self._retry_delay(e, attempt, model)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._settle(prompt, max_tokens, Completion("".join(content), usage))
+            return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return breaker state, bucket levels and counters."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self.failures
+        stats["requests_available"] = self.requests.available()
+        stats["tokens_available"] = self.tokens.available()
+        return stats
+
+
+class GovernedProvider:
+    """A provider whose calls all go through an LLMGovernor."""
+
+    def __init__(self, inner, governor: LLMGovernor):
+        """Wrap a provider."""
+        self.inner = inner
+        self.governor = governor
+        llm_circuit_state.set(STATE_VALUES[governor.state], model=inner.model)
+
+    @property
+    def name(self) -> str:
+        """The wrapped provider's name."""
+        return self.inner.name
+
+    @property
+    def model(self) -> str:
+        """The wrapped provider's model."""
+        return self.inner.model
+
+    def is_configured(self) -> bool:
+        """Whether the wrapped provider is usable."""
+        return self.inner.is_configured()
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Governed blocking completion."""
+        return self.governor.call(
+            self.model, prompt, max_tokens, lambda: self.inner.complete(prompt, temperature, max_tokens)
+        )
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Governed non-blocking completion."""
+        return await self.governor.acall(
+            self.model, prompt, max_tokens, lambda: self.inner.acomplete(prompt, temperature, max_tokens)
+        )
+
+    def astream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[Completion]:
+        """Governed streamed completion."""
+        return self.governor.astream(
+            self.model, prompt, max_tokens, lambda: self.inner.astream(prompt, temperature, max_tokens)
+        )
+
+
+def make_governor() -> LLMGovernor:
+    """LLMGovernor configured from LLM_* environment variables."""
+    return LLMGovernor(
+        requests_per_minute=float(os.getenv("LLM_RPM", "30")),
+        tokens_per_minute=float(os.getenv("LLM_TPM", "12000")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+        max_retry_after=float(os.getenv("LLM_MAX_RETRY_AFTER", "30")),
+        timeout=float(os.getenv("LLM_CALL_TIMEOUT", "30")),
+        breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        breaker_cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+    )
+
+
+# Global LLM call governor instance
+llm_governor = make_governor()
+
+
+def _collect_bucket_levels() -> None:
+    """Refresh the bucket gauges before each scrape."""
+    llm_bucket_level.set(llm_governor.requests.available(), bucket="requests")
+    llm_bucket_level.set(llm_governor.tokens.available(), bucket="tokens")
+
+
+metrics.registry.add_collector(_collect_bucket_levels)
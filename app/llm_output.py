@@ -0,0 +1,205 @@
+"""Validation and salvage of model output against the analysis and quiz schemas."""
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from pydantic import ValidationError
+from app import metrics, schemas
+from app.json_stream import TRUNCATED, extract_json
+
+# Outcomes of parsing one completion
+CLEAN, REPAIRED, SALVAGED, FAILED = "clean", "repaired", "salvaged", "failed"
+OUTCOMES = (CLEAN, REPAIRED, SALVAGED, FAILED)
+
+# Placeholders for analysis sections the model output lacked
+DEFAULT_SECTIONS = {
+    "analysis": {"missing": [], "underdeveloped": [], "fit_score": 0},
+    "recommendations": [],
+    "study_plan": "Unable to generate study plan"
+}
+
+llm_outputs = metrics.registry.register(metrics.Counter(
+    "llm_output_total", "Parsed LLM completions by kind and outcome (clean, repaired, salvaged, failed).",
+    ("kind", "outcome")
+))
+
+
+class OutputStats:
+    """Per-kind counters of how model output had to be parsed."""
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, outcome: str) -> None:
+        """Count one parsed completion."""
+        with self._lock:
+            counts = self._counts.setdefault(kind, dict.fromkeys(OUTCOMES, 0))
+            counts[outcome] += 1
+        llm_outputs.inc(kind=kind, outcome=outcome)
+
+    def get_stats(self, kinds: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return counters with repair and failure rates per kind.
+
+        Args:
+            kinds: Kinds to include; all when None
+        """
+        with self._lock:
+            counts = {kind: dict(c) for kind, c in self._counts.items() if kinds is None or kind in kinds}
+        for c in counts.values():
+            total = sum(c[outcome] for outcome in OUTCOMES)
+            c["repair_rate"] = round((c[REPAIRED] + c[SALVAGED]) / total, 4) if total else 0.0
+            c["failure_rate"] = round(c[FAILED] / total, 4) if total else 0.0
+        return counts
+
+
+# Global output stats instance
+output_stats = OutputStats()
+
+
+def _text(value: Any) -> Optional[str]:
+    """A string section value; lists of lines are joined."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and all(isinstance(line, str) for line in value):
+        return "\n".join(value)
+    return None
+
+
+def _analysis_block(value: Any) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Clean the analysis section, returning (block or None if unusable, whether it was altered)."""
+    if not isinstance(value, dict):
+        return None, False
+    block = dict(value)
+    missing = [skill for skill in block.get("missing", []) if isinstance(skill, str)] \
+        if isinstance(block.get("missing"), list) else []
+    underdeveloped = [item for item in block.get("underdeveloped", []) if isinstance(item, dict)] \
+        if isinstance(block.get("underdeveloped"), list) else []
+    try:
+        fit_score = min(100, max(0, int(block.get("fit_score"))))
+    except (TypeError, ValueError):
+        fit_score = 0
+    altered = (missing, underdeveloped, fit_score) != (
+        block.get("missing"), block.get("underdeveloped"), block.get("fit_score")
+    )
+    block.update(missing=missing, underdeveloped=underdeveloped, fit_score=fit_score)
+    if "overall_assessment" in block and not isinstance(block["overall_assessment"], str):
+        del block["overall_assessment"]
+        altered = True
+    return block, altered
+
+
+def _recommendations(value: Any) -> Tuple[Optional[List[Dict[str, str]]], bool]:
+    """Keep the well-formed recommendations, returning (list or None if unusable, whether any were dropped)."""
+    if not isinstance(value, list):
+        return None, False
+    kept = [
+        {key: str(field) for key, field in item.items() if field is not None}
+        for item in value
+        if isinstance(item, dict) and item.get("title")
+    ]
+    return kept, len(kept) != len(value)
+
+
+def parse_analysis(content: str) -> Dict[str, Any]:
+    """
+    Parse a full gap analysis and validate it against AnalysisResponse.
+
+    Sections that are missing or malformed get the same placeholders as a
+    failed analysis. They are listed under "incomplete", together with the
+    section the output was cut off in (e.g. at max_tokens), whose partial
+    value is kept. Incomplete results are not cached.
+
+    Raises:
+        ValueError: If the output holds no usable section at all
+    """
+    try:
+        data, repair = extract_json(content)
+    except ValueError:
+        output_stats.record("analysis", FAILED)
+        raise
+
+    analysis, altered = _analysis_block(data.get("analysis"))
+    recommendations, dropped = _recommendations(data.get("recommendations"))
+    sections = {"analysis": analysis, "recommendations": recommendations, "study_plan": _text(data.get("study_plan"))}
+    incomplete = [name for name, value in sections.items() if value is None]
+    if len(incomplete) == len(sections):
+        output_stats.record("analysis", FAILED)
+        raise ValueError("Model output has none of the analysis sections")
+    if repair == TRUNCATED:
+        cut = [name for name in data if name in sections and sections[name] is not None][-1:]
+        incomplete = [name for name in sections if name in incomplete or name in cut]
+
+    result = {name: DEFAULT_SECTIONS[name] if value is None else value for name, value in sections.items()}
+    try:
+        result = schemas.AnalysisResponse(**result, ai_used=True).model_dump()
+    except ValidationError as e:
+        output_stats.record("analysis", FAILED)
+        raise ValueError(f"Model output does not match the analysis schema: {e}") from e
+    if incomplete:
+        result["incomplete"] = incomplete
+    output_stats.record("analysis", SALVAGED if incomplete or altered or dropped else REPAIRED if repair else CLEAN)
+    return result
+
+
+def parse_narrative(content: str) -> Dict[str, Any]:
+    """
+    Parse the narrative-only output (overall_assessment and study_plan).
+
+    Raises:
+        ValueError: If neither field is usable
+    """
+    try:
+        data, repair = extract_json(content)
+    except ValueError:
+        output_stats.record("narrative", FAILED)
+        raise
+
+    result = {name: _text(data.get(name)) for name in ("overall_assessment", "study_plan")}
+    result = {name: value for name, value in result.items() if value is not None}
+    if not result:
+        output_stats.record("narrative", FAILED)
+        raise ValueError("Model output has neither overall_assessment nor study_plan")
+    outcome = SALVAGED if len(result) < 2 or repair == TRUNCATED else REPAIRED if repair else CLEAN
+    output_stats.record("narrative", outcome)
+    return result
+
+
+def parse_quiz(content: str, skill: str) -> Dict[str, Any]:
+    """
+    Parse a quiz and validate it against QuizResponse.
+
+    Questions that fail QuizQuestion validation, or whose correct index
+    is not one of their options, are dropped.
+
+    Args:
+        content: Raw model output
+        skill: Requested skill, used if the output doesn't name one
+
+    Raises:
+        ValueError: If no valid question remains
+    """
+    try:
+        data, repair = extract_json(content)
+    except ValueError:
+        output_stats.record("quiz", FAILED)
+        raise
+
+    raw = data.get("questions") if isinstance(data.get("questions"), list) else []
+    questions = []
+    for item in raw:
+        try:
+            question = schemas.QuizQuestion(**item) if isinstance(item, dict) else None
+        except ValidationError:
+            question = None
+        if question is not None and len(question.options) >= 2 and 0 <= question.correct < len(question.options):
+            questions.append(question)
+    if not questions:
+        output_stats.record("quiz", FAILED)
+        raise ValueError("Model output has no valid quiz questions")
+
+    name = data.get("skill") if isinstance(data.get("skill"), str) else skill
+    result = schemas.QuizResponse(skill=name, questions=questions).model_dump(exclude_none=True)
+    outcome = SALVAGED if len(questions) < len(raw) or repair == TRUNCATED else REPAIRED if repair else CLEAN
+    output_stats.record("quiz", outcome)
+    return result
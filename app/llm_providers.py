@@ -0,0 +1,546 @@
+"""Chat completion backends behind AIClient: Groq, OpenAI-compatible HTTP, stub and record/replay."""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, AsyncIterator, NamedTuple
+import httpx
+from groq import Groq, AsyncGroq, APIStatusError, APIError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Usage(NamedTuple):
+    """Token usage reported for one completion."""
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class Completion(NamedTuple):
+    """
+    A completion, or one streamed delta of it.
+
+    Streams yield deltas with usage None except, when the backend reports
+    it, on the last one.
+    """
+    content: str
+    usage: Optional[Usage] = None
+
+
+class LLMError(Exception):
+    """A failed completion, with the HTTP status and Retry-After seconds when known."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        """Initialize with the provider's status code and retry hint."""
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header given in seconds, or None."""
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) for backends that report none."""
+    return max(1, len(text) // 4)
+
+
+class GroqProvider:
+    """Groq's hosted API through the official SDK."""
+
+    name = "groq"
+
+    def __init__(self, api_key: Optional[str], model: str, timeout: float = 60.0):
+        """
+        Create sync and async SDK clients when an API key is set.
+
+        The SDK's own retries are disabled; LLMGovernor retries instead, so
+        backoff and the circuit breaker see every attempt.
+        """
+        self.api_key = api_key
+        self.model = model
+        self._client = Groq(api_key=api_key, timeout=timeout, max_retries=0) if api_key else None
+        self._async_client = AsyncGroq(api_key=api_key, timeout=timeout, max_retries=0) if api_key else None
+
+    def is_configured(self) -> bool:
+        """Whether an API key is set."""
+        return bool(self.api_key)
+
+    @staticmethod
+    def _error(e: APIError) -> LLMError:
+        """Map an SDK error to LLMError."""
+        if isinstance(e, APIStatusError):
+            retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+            return LLMError(str(e), e.response.status_code, retry_after)
+        return LLMError(str(e))
+
+    @staticmethod
+    def _usage(usage: Any) -> Optional[Usage]:
+        """Usage from an SDK usage object."""
+        return Usage(usage.prompt_tokens, usage.completion_tokens) if usage else None
+
+    def _request(self, prompt: str, temperature: float, max_tokens: int, **kwargs) -> Dict[str, Any]:
+        """Keyword arguments for chat.completions.create."""
+        return dict(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Blocking completion."""
+        try:
+            response = self._client.chat.completions.create(**self._request(prompt, temperature, max_tokens))
+        except APIError as e:
+            raise self._error(e) from e
+        return Completion(response.choices[0].message.content, self._usage(response.usage))
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Non-blocking completion."""
+        try:
+            response = await self._async_client.chat.completions.create(
+                **self._request(prompt, temperature, max_tokens)
+            )
+        except APIError as e:
+            raise self._error(e) from e
+        return Completion(response.choices[0].message.content, self._usage(response.usage))
+
+    async def astream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[Completion]:
+        """Streamed completion; Groq reports usage on the final chunk under x_groq."""
+        try:
+            stream = await self._async_client.chat.completions.create(
+                **self._request(prompt, temperature, max_tokens, stream=True)
+            )
+            async for chunk in stream:
+                usage = self._usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text or usage:
+                    yield Completion(text or "", usage)
+        except APIError as e:
+            raise self._error(e) from e
+
+
+class OpenAICompatibleProvider:
+    """
+    Any server speaking the OpenAI /chat/completions protocol over HTTP.
+
+    Used for the local stub server (app/llm_stub.py), and works with
+    OpenAI-compatible gateways such as Groq's own /openai/v1 endpoint.
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: Optional[str], model: str, timeout: float = 60.0):
+        """Create pooled sync and async HTTP clients."""
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.Client(base_url=self.base_url, headers=headers, timeout=timeout)
+        self._async_client = httpx.AsyncClient(base_url=self.base_url, headers=headers, timeout=timeout)
+
+    def is_configured(self) -> bool:
+        """Always usable; the server decides whether a key is needed."""
+        return True
+
+    def _body(self, prompt: str, temperature: float, max_tokens: int, stream: bool = False) -> Dict[str, Any]:
+        """Request body for /chat/completions."""
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    @staticmethod
+    def _check(response: httpx.Response) -> None:
+        """Raise LLMError for a non-2xx response."""
+        if response.status_code >= 400:
+            raise LLMError(
+                f"HTTP {response.status_code} from LLM server",
+                response.status_code,
+                parse_retry_after(response.headers.get("retry-after"))
+            )
+
+    @staticmethod
+    def _usage(usage: Optional[Dict[str, int]]) -> Optional[Usage]:
+        """Usage from a response's usage object."""
+        return Usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)) if usage else None
+
+    @classmethod
+    def _completion(cls, payload: Dict[str, Any]) -> Completion:
+        """Completion from a non-streamed response body."""
+        return Completion(payload["choices"][0]["message"]["content"], cls._usage(payload.get("usage")))
+
+    @classmethod
+    def _delta(cls, line: str) -> Optional[Completion]:
+        """Delta from one server-sent event line, or None for other lines."""
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return None
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        text = (choices[0].get("delta") or {}).get("content") if choices else None
+        usage = cls._usage(chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage"))
+        return Completion(text or "", usage) if text or usage else None
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Blocking completion."""
+        try:
+            response = self._client.post("/chat/completions", json=self._body(prompt, temperature, max_tokens))
+        except httpx.HTTPError as e:
+            raise LLMError(str(e)) from e
+        self._check(response)
+        return self._completion(response.json())
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Non-blocking completion."""
+        try:
+            response = await self._async_client.post(
+                "/chat/completions", json=self._body(prompt, temperature, max_tokens)
+            )
+        except httpx.HTTPError as e:
+            raise LLMError(str(e)) from e
+        self._check(response)
+        return self._completion(response.json())
+
+    async def astream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[Completion]:
+        """Streamed completion over server-sent events."""
+        body = self._body(prompt, temperature, max_tokens, stream=True)
+        try:
+            async with self._async_client.stream("POST", "/chat/completions", json=body) as response:
+                self._check(response)
+                async for line in response.aiter_lines():
+                    delta = self._delta(line)
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as e:
+            raise LLMError(str(e)) from e
+
+
+class StubBackend:
+    """
+    Deterministic stand-in for a model, shared by StubProvider and the stub server.
+
+    Replies are canned JSON of the shape each prompt asks for (quiz,
+    narrative or full analysis), varied by a hash of the prompt so the
+    same prompt always gets the same reply. Latency is log-normal around
+    a median time to first token, plus a per-token streaming delay.
+    Errors are injected at a fixed rate as 429s with Retry-After or 503s.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        jitter: float = 0.3,
+        tokens_per_second: float = 200.0,
+        error_rate: float = 0.0,
+        seed: int = 0
+    ):
+        """
+        Args:
+            latency_ms: Median time to first token
+            jitter: Sigma of the log-normal latency distribution (0 = fixed)
+            tokens_per_second: Output pacing; 0 returns the whole reply at once
+            error_rate: Share of calls that fail, half as 429 and half as 503
+            seed: Seed for latency and error draws
+        """
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def first_token_delay(self) -> float:
+        """Seconds before the first token."""
+        with self._lock:
+            factor = self._random.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        return self.latency_ms * factor / 1000
+
+    def token_delay(self) -> float:
+        """Seconds between streamed tokens."""
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def maybe_fail(self) -> None:
+        """Raise an injected LLMError at the configured rate."""
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.error_rate / 2:
+            raise LLMError("Injected rate limit", status_code=429, retry_after=1.0)
+        if draw < self.error_rate:
+            raise LLMError("Injected server error", status_code=503)
+
+    @staticmethod
+    def reply(prompt: str) -> str:
+        """Canned model output for a prompt, the same for the same prompt."""
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        if "multiple-choice questions" in prompt:
+            match = re.search(r"for the skill: (.+?)\.", prompt)
+            skill = match.group(1) if match else "the skill"
+            difficulties = ["beginner", "intermediate", "intermediate", "advanced"]
+            questions = [
+                {
+                    "q": f"Question {n + 1} about {skill}?",
+                    "options": [f"Option {letter}" for letter in "ABCD"],
+                    "correct": (digest >> (2 * n)) % 4,
+                    "difficulty": difficulty
+                }
+                for n, difficulty in enumerate(difficulties)
+            ]
+            return json.dumps({"skill": skill, "questions": questions}, indent=2)
+        plan = "Week 1-2: Review fundamentals. Week 3-4: Build a project. Week 5-6: Practice and review."
+        if "Gap analysis (already computed" in prompt:
+            return json.dumps({"overall_assessment": "Solid foundation with a few gaps to close.", "study_plan": plan}, indent=2)
+        return json.dumps({
+            "analysis": {
+                "missing": [],
+                "underdeveloped": [],
+                "fit_score": 40 + digest % 60,
+                "overall_assessment": "Solid foundation with a few gaps to close."
+            },
+            "recommendations": [],
+            "study_plan": plan
+        }, indent=2)
+
+    @staticmethod
+    def tokens(content: str) -> List[str]:
+        """Split content into roughly token-sized pieces for streaming."""
+        return re.findall(r"\s*\S{1,4}|\s+", content)
+
+    def usage(self, prompt: str, content: str) -> Usage:
+        """Estimated usage of a reply."""
+        return Usage(estimate_tokens(prompt), len(self.tokens(content)))
+
+
+class StubProvider:
+    """In-process StubBackend, for tests and benchmarks without a network."""
+
+    name = "stub"
+
+    def __init__(self, backend: StubBackend, model: str = "stub"):
+        """Wrap a stub backend."""
+        self.backend = backend
+        self.model = model
+
+    def is_configured(self) -> bool:
+        """Always usable."""
+        return True
+
+    def _delay(self, content: str) -> float:
+        """Total seconds a non-streamed reply takes."""
+        return self.backend.first_token_delay() + self.backend.token_delay() * len(self.backend.tokens(content))
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Blocking completion."""
+        self.backend.maybe_fail()
+        content = self.backend.reply(prompt)
+        time.sleep(self._delay(content))
+        return Completion(content, self.backend.usage(prompt, content))
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Non-blocking completion."""
+        self.backend.maybe_fail()
+        content = self.backend.reply(prompt)
+        await asyncio.sleep(self._delay(content))
+        return Completion(content, self.backend.usage(prompt, content))
+
+    async def astream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[Completion]:
+        """Streamed completion, one token-sized piece per token delay."""
+        self.backend.maybe_fail()
+        content = self.backend.reply(prompt)
+        await asyncio.sleep(self.backend.first_token_delay())
+        for piece in self.backend.tokens(content):
+            yield Completion(piece)
+            await asyncio.sleep(self.backend.token_delay())
+        yield Completion("", self.backend.usage(prompt, content))
+
+
+def recording_key(prompt: str, temperature: float, max_tokens: int) -> str:
+    """Key of a recorded completion; the model is left out so recordings replay under any name."""
+    return hashlib.sha256(json.dumps([prompt, temperature, max_tokens]).encode()).hexdigest()
+
+
+class RecordingProvider:
+    """
+    Pass calls through to another provider and append each reply to a JSONL file.
+
+    Streamed replies are recorded once complete. Replay them offline with
+    ReplayProvider.
+    """
+
+    def __init__(self, inner, path: str):
+        """Wrap a provider, appending to path."""
+        self.inner = inner
+        self.path = path
+        self.name = f"{inner.name}+record"
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        """The wrapped provider's model."""
+        return self.inner.model
+
+    def is_configured(self) -> bool:
+        """Whether the wrapped provider is usable."""
+        return self.inner.is_configured()
+
+    def _record(self, prompt: str, temperature: float, max_tokens: int, completion: Completion) -> None:
+        """Append one completion to the recording."""
+        line = json.dumps({
+            "key": recording_key(prompt, temperature, max_tokens),
+            "model": self.model,
+            "content": completion.content,
+            "usage": completion.usage._asdict() if completion.usage else None
+        })
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Blocking completion, recorded."""
+        completion = self.inner.complete(prompt, temperature, max_tokens)
+        self._record(prompt, temperature, max_tokens, completion)
+        return completion
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Non-blocking completion, recorded."""
+        completion = await self.inner.acomplete(prompt, temperature, max_tokens)
+        self._record(prompt, temperature, max_tokens, completion)
+        return completion
+
+    async def astream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[Completion]:
+        """Streamed completion, recorded when the stream finishes."""
+        content, usage = [], None
+        async for delta in self.inner.astream(prompt, temperature, max_tokens):
+            content.append(delta.content)
+            usage = delta.usage or usage
+            yield delta
+        self._record(prompt, temperature, max_tokens, Completion("".join(content), usage))
+
+
+class ReplayProvider:
+    """
+    Serve completions recorded by RecordingProvider, with stub latency.
+
+    Prompts that were never recorded raise LLMError (status 404), so a
+    replayed benchmark fails loudly instead of silently measuring something
+    else. The last recording of a prompt wins.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, backend: StubBackend, model: Optional[str] = None):
+        """Load every recording in path."""
+        self.path = path
+        self.backend = backend
+        self._recordings: Dict[str, Completion] = {}
+        models = set()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                usage = Usage(**entry["usage"]) if entry.get("usage") else None
+                self._recordings[entry["key"]] = Completion(entry["content"], usage)
+                models.add(entry.get("model"))
+        self.model = model or (models.pop() if len(models) == 1 else "replay")
+        self.stats = {"hits": 0, "misses": 0}
+
+    def is_configured(self) -> bool:
+        """Always usable."""
+        return True
+
+    def _lookup(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """The recorded completion of a prompt."""
+        completion = self._recordings.get(recording_key(prompt, temperature, max_tokens))
+        if completion is None:
+            self.stats["misses"] += 1
+            raise LLMError("No recorded completion for this prompt", status_code=404)
+        self.stats["hits"] += 1
+        return completion
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Blocking replay."""
+        completion = self._lookup(prompt, temperature, max_tokens)
+        time.sleep(self.backend.first_token_delay())
+        return completion
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int) -> Completion:
+        """Non-blocking replay."""
+        completion = self._lookup(prompt, temperature, max_tokens)
+        await asyncio.sleep(self.backend.first_token_delay())
+        return completion
+
+    async def astream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[Completion]:
+        """Streamed replay, paced like the stub."""
+        completion = self._lookup(prompt, temperature, max_tokens)
+        await asyncio.sleep(self.backend.first_token_delay())
+        for piece in self.backend.tokens(completion.content):
+            yield Completion(piece)
+            await asyncio.sleep(self.backend.token_delay())
+        yield Completion("", completion.usage)
+
+
+def make_stub_backend() -> StubBackend:
+    """StubBackend configured from LLM_STUB_* environment variables."""
+    return StubBackend(
+        latency_ms=float(os.getenv("LLM_STUB_LATENCY_MS", "300")),
+        jitter=float(os.getenv("LLM_STUB_JITTER", "0.3")),
+        tokens_per_second=float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "200")),
+        error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+        seed=int(os.getenv("LLM_STUB_SEED", "0"))
+    )
+
+
+def make_provider(name: str = os.getenv("LLM_PROVIDER", "groq")):
+    """
+    Create the provider selected by LLM_PROVIDER (groq, openai, stub or replay).
+
+    With LLM_RECORD_PATH set, groq and openai replies are also appended to
+    that file for later replay (LLM_PROVIDER=replay, LLM_REPLAY_PATH).
+    """
+    if name == "groq":
+        provider = GroqProvider(
+            os.getenv("GROQ_API_KEY"),
+            os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
+            timeout=float(os.getenv("LLM_CALL_TIMEOUT", "30"))
+        )
+    elif name == "openai":
+        provider = OpenAICompatibleProvider(
+            os.getenv("LLM_BASE_URL", "http://localhost:8001/v1"),
+            os.getenv("LLM_API_KEY"),
+            os.getenv("LLM_MODEL", "stub"),
+            timeout=float(os.getenv("LLM_CALL_TIMEOUT", "30"))
+        )
+    elif name == "stub":
+        return StubProvider(make_stub_backend(), os.getenv("LLM_MODEL", "stub"))
+    elif name == "replay":
+        return ReplayProvider(
+            os.getenv("LLM_REPLAY_PATH", "./llm_recording.jsonl"), make_stub_backend(), os.getenv("LLM_MODEL")
+        )
+    else:
+        raise ValueError(f"Unknown LLM_PROVIDER '{name}', expected groq, openai, stub or replay")
+
+    record_path = os.getenv("LLM_RECORD_PATH")
+    return RecordingProvider(provider, record_path) if record_path else provider
+
+
+# Global LLM provider instance
+llm_provider = make_provider()
@@ -0,0 +1,103 @@
+"""Local OpenAI-compatible chat completion server backed by StubBackend.
+
+Point the API at it with LLM_PROVIDER=openai and
+LLM_BASE_URL=http://localhost:8001/v1 to run the analysis and quiz
+pipeline offline. Latency, streaming pace and error injection follow the
+LLM_STUB_* environment variables.
+
+Usage:
+    uvicorn app.llm_stub:app --port 8001
+"""
+import json
+import time
+import uuid
+import asyncio
+from typing import List, Dict, Any, Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from app.llm_providers import LLMError, make_stub_backend
+
+backend = make_stub_backend()
+
+app = FastAPI(title="LLM Stub", description="OpenAI-compatible stand-in for load and offline testing")
+
+
+class ChatMessage(BaseModel):
+    """One chat message."""
+    role: str
+    content: str
+
+
+class ChatCompletionRequest(BaseModel):
+    """Subset of the OpenAI chat completion request the API sends."""
+    model: str = "stub"
+    messages: List[ChatMessage]
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    stream: bool = False
+
+
+def error_response(e: LLMError) -> JSONResponse:
+    """OpenAI-style error body with Retry-After for rate limits."""
+    headers = {"Retry-After": str(int(e.retry_after))} if e.retry_after is not None else None
+    body = {"error": {"message": str(e), "type": "rate_limit_exceeded" if e.status_code == 429 else "server_error"}}
+    return JSONResponse(body, status_code=e.status_code, headers=headers)
+
+
+def chunk(completion_id: str, model: str, delta: Dict[str, Any], usage: Optional[Dict[str, int]] = None) -> str:
+    """One server-sent event of a streamed completion."""
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": None if delta else "stop"}],
+    }
+    if usage:
+        payload["usage"] = usage
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatCompletionRequest):
+    """Reply with the stub's canned JSON for the prompt, optionally streamed."""
+    try:
+        backend.maybe_fail()
+    except LLMError as e:
+        return error_response(e)
+
+    prompt = request.messages[-1].content
+    content = backend.reply(prompt)
+    tokens = backend.tokens(content)
+    usage = backend.usage(prompt, content)._asdict()
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    if request.stream:
+        async def events():
+            await asyncio.sleep(backend.first_token_delay())
+            yield chunk(completion_id, request.model, {"role": "assistant", "content": ""})
+            for piece in tokens:
+                yield chunk(completion_id, request.model, {"content": piece})
+                await asyncio.sleep(backend.token_delay())
+            yield chunk(completion_id, request.model, {}, usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(backend.first_token_delay() + backend.token_delay() * len(tokens))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+
+@app.get("/v1/models")
+def list_models():
+    """The single stub model."""
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "skill-manager"}]}
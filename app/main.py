@@ -1,16 +1,35 @@
 """Main FastAPI application."""
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app import metrics
 from app.db import init_db
+from app.ai_client import ai_client
+from app.quiz_pool import quiz_pool
 from app.routes import users, skills, roles, courses, analysis, quiz, certifications, achievements
 
 # Initialize database
 init_db()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers."""
+    pool_enabled = ai_client.is_configured() and os.getenv("QUIZ_POOL_ENABLED", "true").lower() == "true"
+    if pool_enabled:
+        quiz_pool.start()
+    yield
+    if pool_enabled:
+        quiz_pool.stop()
+
+
 app = FastAPI(
     title="Skill Manager API",
     description="AI-powered skill management and career development platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    dependencies=[Depends(metrics.track_in_flight)]
 )
 
 # Configure CORS
@@ -20,7 +39,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the pagination cursor
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Include routers
 app.include_router(users.router)
@@ -48,6 +70,7 @@ def read_root():
             "courses": "/courses/",
             "analysis": "/analysis/",
             "quiz": "/quiz/{skill}",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -56,4 +79,10 @@ def read_root():
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Request, SQL and LLM metrics of this process in the Prometheus text format."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
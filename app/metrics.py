@@ -0,0 +1,342 @@
+"""In-process metrics rendered in the Prometheus text exposition format."""
+import time
+import threading
+import contextvars
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# LLM call latency buckets in seconds
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+# SQL statements per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Prompt sizes in tokens
+PROMPT_TOKEN_BUCKETS = (250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+
+# Route label for work done outside a request (e.g. the quiz pool)
+BACKGROUND_ROUTE = "background"
+# Route label for requests that matched no route
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], le: Optional[str] = None) -> str:
+    """Render a label set as {a="x",b="y"}, with an optional histogram bucket bound."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, dropping the fraction of whole numbers."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """A named metric family with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        """Initialize an empty family."""
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Label values in declaration order."""
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        """Exposition lines for this family, HELP and TYPE first."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        """Sample lines for one label set."""
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add to the counter."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down per label set."""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add to the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Subtract from the gauge."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """Initialize an empty histogram with the given upper bounds."""
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        """Bucket, sum and count lines for one label set."""
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = _format_labels(self.label_names, key, _format_value(bound))
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, '+Inf')} {count}")
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of metric families."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric family and return it."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Add a callback that refreshes gauges just before each render."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """The whole registry in the Prometheus text format."""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("route", "method")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("route", "method")
+))
+db_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ("route", "method"), QUERY_COUNT_BUCKETS
+))
+db_latency = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per HTTP request.", ("route", "method")
+))
+llm_latency = registry.register(Histogram(
+    "llm_request_duration_seconds", "LLM completion latency, including streamed output.", ("route", "model"),
+    LLM_LATENCY_BUCKETS
+))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "LLM tokens used by kind (prompt or completion).", ("route", "model", "kind")
+))
+llm_failures = registry.register(Counter(
+    "llm_failures_total", "LLM calls that raised an error.", ("route", "model")
+))
+llm_prompt_tokens = registry.register(Histogram(
+    "llm_prompt_tokens", "Locally counted prompt size in tokens, by prompt kind.", ("route", "kind"),
+    PROMPT_TOKEN_BUCKETS
+))
+
+
+class RequestMetrics:
+    """Per-request state shared with the SQL and LLM instrumentation."""
+
+    __slots__ = ("scope", "in_flight", "queries", "query_seconds")
+
+    def __init__(self, scope: Dict[str, Any]):
+        """Start tracking a request."""
+        self.scope = scope
+        self.in_flight = False
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        """
+        Path template of the matched route, e.g. /users/{user_id}.
+
+        Starlette records the route in the scope once routing has run;
+        templates keep label cardinality bounded, unlike raw paths.
+        """
+        return getattr(self.scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+# Copied into threadpool workers, so sync endpoints see their request too
+_current_request: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar(
+    "current_request_metrics", default=None
+)
+
+
+def current_route() -> str:
+    """Route label of the request being served, or "background"."""
+    request = _current_request.get()
+    return request.route if request else BACKGROUND_ROUTE
+
+
+async def track_in_flight() -> None:
+    """
+    App-wide dependency counting the request as in flight under its route.
+
+    Dependencies run after routing, which is the earliest point the route
+    is known; MetricsMiddleware decrements the gauge when the response ends.
+    """
+    request = _current_request.get()
+    if request is not None and not request.in_flight:
+        request.in_flight = True
+        http_in_flight.inc(route=request.route, method=request.scope["method"])
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and SQL usage per route.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware so streamed
+    responses are timed to their last chunk without being buffered.
+    """
+
+    def __init__(self, app):
+        """Wrap an ASGI application."""
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """Serve one request, recording its metrics when the response completes."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics(scope)
+        token = _current_request.set(request)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            route, method = request.route, scope["method"]
+            if request.in_flight:
+                http_in_flight.dec(route=route, method=method)
+            http_requests.inc(route=route, method=method, status=str(status[0]))
+            http_latency.observe(elapsed, route=route, method=method)
+            db_queries.observe(request.queries, route=route, method=method)
+            db_latency.observe(request.query_seconds, route=route, method=method)
+            _current_request.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Note the statement start time on the connection."""
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Attribute the statement to the current request."""
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    request = _current_request.get()
+    if request is not None:
+        request.queries += 1
+        request.query_seconds += elapsed
+
+
+def record_llm_call(model: str, seconds: float, usage: Any = None, failed: bool = False) -> None:
+    """
+    Record one LLM completion under the current route.
+
+    Args:
+        model: Model name sent to the provider
+        seconds: Wall time of the call, including streamed output
+        usage: Provider usage object with prompt_tokens/completion_tokens, if any
+        failed: Whether the call raised
+    """
+    route = current_route()
+    llm_latency.observe(seconds, route=route, model=model)
+    if failed:
+        llm_failures.inc(route=route, model=model)
+    if usage is not None:
+        llm_tokens.inc(getattr(usage, "prompt_tokens", 0) or 0, route=route, model=model, kind="prompt")
+        llm_tokens.inc(getattr(usage, "completion_tokens", 0) or 0, route=route, model=model, kind="completion")
+
+
+def record_prompt_tokens(kind: str, tokens: int) -> None:
+    """Record the size of a built prompt (analysis, narrative or quiz) under the current route."""
+    llm_prompt_tokens.observe(tokens, route=current_route(), kind=kind)
+
+
+def render() -> str:
+    """Current metrics in the Prometheus text format."""
+    return registry.render()
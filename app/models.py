@@ -1,6 +1,6 @@
 """SQLAlchemy database models."""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index, func
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -30,6 +30,34 @@ class Skill(Base):
 
     user = relationship("User", back_populates="skills")
 
+    __table_args__ = (
+        # Covering index for talent search: rows for one skill in user_id
+        # order, so keyset pages and per-user EXISTS probes are index seeks
+        Index("ix_skills_lname_user_id_level", func.lower(name), user_id, level),
+        Index("ix_skills_user_id", user_id),
+    )
+
+
+class CanonicalSkill(Base):
+    """Canonical skill vocabulary entry that user skill names resolve to."""
+    __tablename__ = "skill_vocabulary"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+
+    aliases = relationship("SkillAlias", back_populates="skill", cascade="all, delete-orphan")
+
+
+class SkillAlias(Base):
+    """Alternative spelling or synonym of a canonical skill."""
+    __tablename__ = "skill_aliases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    alias = Column(String, unique=True, nullable=False)  # stored normalized
+    skill_id = Column(Integer, ForeignKey("skill_vocabulary.id"), nullable=False)
+
+    skill = relationship("CanonicalSkill", back_populates="aliases")
+
 
 class Role(Base):
     """Role model for storing job roles and their requirements."""
@@ -74,4 +102,12 @@ class Achievement(Base):
     date = Column(String, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
-    user = relationship("User", back_populates="achievements")
\ No newline at end of file
+    user = relationship("User", back_populates="achievements")
+
+
+class DataVersion(Base):
+    """Change counter for a cached resource, shared by every worker process."""
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)  # "catalog" or "user:<id>"
+    version = Column(Integer, nullable=False, default=0)
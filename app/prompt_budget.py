@@ -0,0 +1,200 @@
+"""Token-budgeted selection of profile items for LLM prompts."""
+import os
+import re
+from typing import Dict, List, Any, Optional, NamedTuple, Callable
+from dotenv import load_dotenv
+from app.gap_engine import normalize_skill_name
+
+load_dotenv()
+
+# Word, number and symbol pieces, roughly as a BPE tokenizer splits text
+PIECE_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]*")
+WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+# Role name words too generic to mark an item as relevant
+GENERIC_ROLE_WORDS = {"and", "the", "for", "of", "senior", "junior", "lead", "engineer", "developer", "specialist"}
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens locally, without a tokenizer dependency.
+
+    Approximates Llama-style BPE on English text: short words are one
+    token, longer ones one per 6 letters, digits one per 3 and every
+    symbol one.
+    """
+    tokens = 0
+    for piece in PIECE_RE.findall(text):
+        if piece.isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece.isalpha():
+            tokens += 1 + (len(piece) - 1) // 6
+        else:
+            tokens += 1
+    return tokens
+
+
+class Profile(NamedTuple):
+    """Profile items deduplicated and ordered by relevance to the target role."""
+    skills: List[Dict[str, Any]]
+    certifications: List[Dict[str, str]]
+    achievements: List[Dict[str, str]]
+
+
+class PromptBuilder:
+    """
+    Fit a user profile into per-section token budgets.
+
+    Items are deduplicated and ranked by how many of the target role's
+    terms (its requirement skills and the words of its name) they
+    mention. Most recent items break ties. Long achievement descriptions
+    are cut down to their most relevant sentences. Items beyond a
+    section's budget are dropped and summarized as "... and N more".
+    """
+
+    def __init__(
+        self,
+        skills_budget: int = int(os.getenv("PROMPT_BUDGET_SKILLS", "250")),
+        certifications_budget: int = int(os.getenv("PROMPT_BUDGET_CERTIFICATIONS", "200")),
+        achievements_budget: int = int(os.getenv("PROMPT_BUDGET_ACHIEVEMENTS", "600")),
+        courses_budget: int = int(os.getenv("PROMPT_BUDGET_COURSES", "400")),
+        description_tokens: int = int(os.getenv("PROMPT_DESCRIPTION_TOKENS", "60"))
+    ):
+        """
+        Args:
+            skills_budget: Tokens for the skills section
+            certifications_budget: Tokens for the certifications section
+            achievements_budget: Tokens for the achievements section
+            courses_budget: Tokens for the course list
+            description_tokens: Tokens per achievement description
+        """
+        self.skills_budget = skills_budget
+        self.certifications_budget = certifications_budget
+        self.achievements_budget = achievements_budget
+        self.courses_budget = courses_budget
+        self.description_tokens = description_tokens
+
+    @staticmethod
+    def role_terms(target_role: str, requirements: Optional[Dict[str, int]] = None) -> Dict[str, float]:
+        """Terms that mark an item as relevant: requirement skills weigh 2, role name words 1."""
+        terms = {
+            word: 1.0 for word in WORD_RE.findall(target_role.lower())
+            if len(word) > 2 and word not in GENERIC_ROLE_WORDS
+        }
+        for skill in requirements or {}:
+            terms[normalize_skill_name(skill)] = 2.0
+        return terms
+
+    @staticmethod
+    def relevance(text: str, terms: Dict[str, float]) -> float:
+        """Summed weight of the terms a text mentions."""
+        text = text.lower()
+        words = set(WORD_RE.findall(text))
+        return sum(weight for term, weight in terms.items() if (term in words if " " not in term else term in text))
+
+    def shorten(self, text: str, terms: Dict[str, float]) -> str:
+        """
+        Cut a description down to description_tokens.
+
+        Keeps whole sentences, the most relevant first, in their original
+        order, and marks the cut with "…"; a single long sentence is cut at
+        a word boundary.
+        """
+        if count_tokens(text) <= self.description_tokens:
+            return text
+        sentences = [s.strip() for s in SENTENCE_RE.findall(text) if s.strip()]
+        ranked = sorted(range(len(sentences)), key=lambda i: (-self.relevance(sentences[i], terms), i))
+        kept, used = set(), 0
+        for i in ranked:
+            size = count_tokens(sentences[i])
+            if used + size <= self.description_tokens - 1:
+                kept.add(i)
+                used += size
+        if kept:
+            return " ".join(sentences[i] for i in sorted(kept)) + " …"
+        words, used = [], 0
+        for word in sentences[ranked[0]].split():
+            used += count_tokens(word)
+            if used > self.description_tokens - 1:
+                break
+            words.append(word)
+        return " ".join(words) + "…"
+
+    def select(
+        self,
+        user_skills: List[Dict[str, Any]],
+        user_certifications: List[Dict[str, str]],
+        user_achievements: List[Dict[str, str]],
+        target_role: str,
+        requirements: Optional[Dict[str, int]] = None
+    ) -> Profile:
+        """
+        Deduplicate, rank and shorten a profile for the target role.
+
+        Skills keep their highest level per normalized name and list the
+        role's requirements first. Certifications are unique by name and
+        issuer, achievements by title and by description.
+        """
+        terms = self.role_terms(target_role, requirements)
+
+        levels: Dict[str, Dict[str, Any]] = {}
+        for skill in user_skills:
+            key = normalize_skill_name(skill["name"])
+            if key not in levels or skill["level"] > levels[key]["level"]:
+                levels[key] = skill
+        required = {normalize_skill_name(skill) for skill in requirements or {}}
+        skills = sorted(levels.values(), key=lambda s: (normalize_skill_name(s["name"]) not in required, -s["level"]))
+
+        certifications, seen = [], set()
+        for cert in user_certifications:
+            key = (cert["name"].strip().lower(), (cert.get("issuer") or "").strip().lower())
+            if key not in seen:
+                seen.add(key)
+                certifications.append(cert)
+        certifications = self._rank(certifications, terms, lambda c: f"{c['name']} {c.get('issuer') or ''}", "date_obtained")
+
+        achievements, titles, descriptions = [], set(), set()
+        for achievement in user_achievements:
+            title = " ".join(achievement["title"].lower().split())
+            description = " ".join((achievement.get("description") or "").lower().split())
+            if title in titles or (description and description in descriptions):
+                continue
+            titles.add(title)
+            descriptions.add(description)
+            achievements.append(achievement)
+        achievements = self._rank(
+            achievements, terms, lambda a: f"{a['title']} {a.get('description') or ''}", "date"
+        )
+        achievements = [
+            {**a, "description": self.shorten(a.get("description") or "", terms)} for a in achievements
+        ]
+        return Profile(skills, certifications, achievements)
+
+    def _rank(
+        self,
+        items: List[Dict[str, str]],
+        terms: Dict[str, float],
+        text: Callable[[Dict[str, str]], str],
+        date_field: str
+    ) -> List[Dict[str, str]]:
+        """Order items by relevance, then most recent first, keeping input order for ties."""
+        by_date = sorted(items, key=lambda item: str(item.get(date_field) or ""), reverse=True)
+        return sorted(by_date, key=lambda item: -self.relevance(text(item), terms))
+
+    @staticmethod
+    def fit(lines: List[str], budget: int) -> List[str]:
+        """Keep the leading lines that fit in budget tokens, noting how many were left out."""
+        kept, used = [], 0
+        for line in lines:
+            used += count_tokens(line) + 1
+            if used > budget:
+                break
+            kept.append(line)
+        if len(kept) < len(lines):
+            kept.append(f"... and {len(lines) - len(kept)} more")
+        return kept
+
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder()
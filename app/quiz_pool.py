@@ -0,0 +1,175 @@
+"""Pool of pre-generated quizzes kept topped up by a background worker."""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Set
+from dotenv import load_dotenv
+from sqlalchemy import func
+from app import models
+from app.db import ReadSessionLocal
+from app.ai_client import ai_client
+from app.gap_engine import normalize_skill_name
+
+load_dotenv()
+
+
+def get_popular_skills(limit: int) -> List[str]:
+    """
+    Return the most common normalized skill names in user skills and role requirements.
+
+    User skills are counted in SQL, grouped on lower(name) so the skills
+    name index covers the scan; role requirements are few and counted here.
+    """
+    db = ReadSessionLocal()
+    try:
+        lname = func.lower(models.Skill.name)
+        rows = db.query(lname, func.count()).group_by(lname).order_by(func.count().desc()).limit(limit).all()
+        requirements = db.query(models.Role.requirements).all()
+    finally:
+        db.close()
+    counts: Dict[str, int] = {}
+    for name, count in rows:
+        key = normalize_skill_name(name)
+        counts[key] = counts.get(key, 0) + count
+    for (names,) in requirements:
+        for name in names:
+            key = normalize_skill_name(name)
+            counts[key] = counts.get(key, 0) + 1
+    return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+
+class QuizPool:
+    """Per-skill queues of ready-to-serve quizzes with a background refill loop."""
+
+    def __init__(
+        self,
+        depth: int = int(os.getenv("QUIZ_POOL_DEPTH", "3")),
+        concurrency: int = int(os.getenv("QUIZ_POOL_CONCURRENCY", "2")),
+        max_age: int = int(os.getenv("QUIZ_POOL_MAX_AGE", "86400")),
+        refill_interval: int = int(os.getenv("QUIZ_POOL_REFILL_INTERVAL", "60")),
+        max_skills: int = int(os.getenv("QUIZ_POOL_MAX_SKILLS", "50"))
+    ):
+        """Initialize an empty pool; call start() to run the refill worker."""
+        self.depth = depth
+        self.concurrency = concurrency
+        self.max_age = max_age
+        self.refill_interval = refill_interval
+        self.max_skills = max_skills
+        self._pools: Dict[str, deque] = {}
+        self._pending: Dict[str, int] = {}
+        self._extra_skills: Set[str] = set()
+        self._popular: List[str] = []
+        self._popular_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {"hits": 0, "misses": 0, "stale_discarded": 0, "generated": 0, "failed": 0}
+
+    def pop(self, skill: str) -> Optional[Dict[str, Any]]:
+        """Take a fresh quiz for the skill from the pool, or None on a miss."""
+        key = normalize_skill_name(skill)
+        now = time.time()
+        with self._lock:
+            queue = self._pools.get(key)
+            while queue:
+                created_at, quiz = queue.popleft()
+                if now - created_at < self.max_age:
+                    self.stats["hits"] += 1
+                    self._wake.set()
+                    return dict(quiz, skill=skill)
+                self.stats["stale_discarded"] += 1
+            self.stats["misses"] += 1
+            # Requested skills are worth keeping warm even if not yet popular
+            if len(self._extra_skills) < self.max_skills:
+                self._extra_skills.add(key)
+        self._wake.set()
+        return None
+
+    def start(self) -> None:
+        """Start the background refill worker."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="quiz-pool")
+        self._thread = threading.Thread(target=self._run, name="quiz-pool-refill", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the refill worker and wait for in-flight generations."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _run(self) -> None:
+        """Refill loop, woken by pops or every refill_interval seconds."""
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.refill()
+            except Exception:
+                # Keep the worker alive; the next pass retries
+                pass
+            self._wake.wait(self.refill_interval)
+
+    def refill(self) -> None:
+        """
+        Schedule quiz generations to bring every popular skill up to depth.
+
+        The popular skills are recomputed at most once per refill_interval,
+        not on every wake-up from a pop.
+        """
+        now = time.time()
+        if self._popular_at is None or now - self._popular_at >= self.refill_interval:
+            self._popular = get_popular_skills(self.max_skills)
+            self._popular_at = now
+        skills = list(self._popular)
+        with self._lock:
+            skills += [s for s in self._extra_skills if s not in skills]
+            for skill in skills:
+                queue = self._pools.setdefault(skill, deque())
+                while queue and now - queue[0][0] >= self.max_age:
+                    queue.popleft()
+                    self.stats["stale_discarded"] += 1
+                missing = self.depth - len(queue) - self._pending.get(skill, 0)
+                for _ in range(max(missing, 0)):
+                    self._pending[skill] = self._pending.get(skill, 0) + 1
+                    self._executor.submit(self._generate, skill)
+
+    def _generate(self, skill: str) -> None:
+        """Generate one quiz and add it to the skill's queue."""
+        try:
+            # Parallel refills of one skill must each get their own quiz
+            quiz = ai_client.generate_quiz(skill, coalesce=False)
+        except Exception as e:
+            quiz = {"error": str(e)}
+        with self._lock:
+            self._pending[skill] -= 1
+            if "error" in quiz:
+                self.stats["failed"] += 1
+                return
+            self._pools.setdefault(skill, deque()).append((time.time(), quiz))
+            self.stats["generated"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current pool depth per skill."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["depth"] = {skill: len(queue) for skill, queue in self._pools.items()}
+            stats["pending"] = {skill: n for skill, n in self._pending.items() if n}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["running"] = self._thread is not None
+        return stats
+
+
+# Global quiz pool instance
+quiz_pool = QuizPool()
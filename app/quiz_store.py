@@ -0,0 +1,252 @@
+"""Bounded store of in-progress quiz attempts, in memory or shared via SQLite."""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def new_attempt(skill: str, questions: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any], int]:
+    """
+    Build the stored state for a quiz attempt.
+
+    Returns:
+        (attempt_id, attempt data, approximate size in bytes)
+    """
+    data = {
+        "skill": skill,
+        "questions": questions,
+        "correct_answers": [q["correct"] for q in questions]
+    }
+    return uuid.uuid4().hex, data, len(json.dumps(data))
+
+
+class MemoryQuizStore:
+    """
+    Per-process attempt store with TTL, LRU eviction and count/byte caps.
+
+    State is lost on restart and not visible to other worker processes;
+    use SQLiteQuizStore when running more than one worker.
+    """
+
+    backend = "memory"
+
+    def __init__(self, ttl: int, max_attempts: int, max_bytes: int):
+        """Initialize an empty store."""
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.max_bytes = max_bytes
+        self._attempts: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "submitted": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def create(self, skill: str, questions: List[Dict[str, Any]]) -> str:
+        """Store a new attempt and return its ID."""
+        attempt_id, data, size = new_attempt(skill, questions)
+        now = time.time()
+        with self._lock:
+            self._attempts[attempt_id] = (now, size, data)
+            self._bytes += size
+            self.stats["created"] += 1
+            self._evict(now)
+        return attempt_id
+
+    def get(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Return an attempt without consuming it, marking it recently used."""
+        with self._lock:
+            entry = self._live(attempt_id)
+            if entry is None:
+                return None
+            self._attempts.move_to_end(attempt_id)
+            return entry[2]
+
+    def pop(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return an attempt so it can be scored exactly once."""
+        with self._lock:
+            entry = self._live(attempt_id)
+            if entry is None:
+                return None
+            del self._attempts[attempt_id]
+            self._bytes -= entry[1]
+            self.stats["submitted"] += 1
+            return entry[2]
+
+    def _live(self, attempt_id: str) -> Optional[Tuple[float, int, Dict[str, Any]]]:
+        """Look up an unexpired attempt, dropping it if it has expired."""
+        entry = self._attempts.get(attempt_id)
+        if entry and time.time() - entry[0] >= self.ttl:
+            del self._attempts[attempt_id]
+            self._bytes -= entry[1]
+            self.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+        return entry
+
+    def _evict(self, now: float) -> None:
+        """
+        Drop expired attempts, then least recently used ones over the caps.
+
+        Expired attempts are swept from the least recently used end and the
+        sweep stops at the first live one, so a create costs only what it
+        removes. An expired attempt read since is left to _live or the caps.
+        """
+        while self._attempts:
+            attempt_id, (created_at, size, _) = next(iter(self._attempts.items()))
+            if now - created_at < self.ttl:
+                break
+            del self._attempts[attempt_id]
+            self._bytes -= size
+            self.stats["expired"] += 1
+        while self._attempts and (len(self._attempts) > self.max_attempts or self._bytes > self.max_bytes):
+            _, (_, size, _) = self._attempts.popitem(last=False)
+            self._bytes -= size
+            self.stats["evicted"] += 1
+
+    def clear(self) -> None:
+        """Drop every attempt."""
+        with self._lock:
+            self._attempts.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters and current size."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["attempts"] = len(self._attempts)
+            stats["bytes"] = self._bytes
+        stats["backend"] = self.backend
+        return stats
+
+
+class SQLiteQuizStore:
+    """
+    Attempt store in a SQLite file shared by every worker process.
+
+    Same TTL, LRU and cap semantics as MemoryQuizStore. Submissions delete
+    the row with DELETE ... RETURNING, so an attempt is scored at most once
+    even when two workers race on it.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, ttl: int, max_attempts: int, max_bytes: int):
+        """Open the database and create the attempts table if needed."""
+        self.path = path
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "submitted": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_attempts ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_quiz_attempts_accessed ON quiz_attempts (accessed_at)"
+        )
+        self._conn.commit()
+
+    def create(self, skill: str, questions: List[Dict[str, Any]]) -> str:
+        """Store a new attempt and return its ID."""
+        attempt_id, data, size = new_attempt(skill, questions)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO quiz_attempts (id, data, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (attempt_id, json.dumps(data), size, now, now)
+            )
+            self.stats["created"] += 1
+            self._evict(now)
+            self._conn.commit()
+        return attempt_id
+
+    def get(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Return an attempt without consuming it, marking it recently used."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE quiz_attempts SET accessed_at = ? WHERE id = ? AND created_at > ? RETURNING data",
+                (now, attempt_id, now - self.ttl)
+            ).fetchone()
+            self._conn.commit()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            return json.loads(row[0])
+
+    def pop(self, attempt_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return an attempt so it can be scored exactly once."""
+        with self._lock:
+            row = self._conn.execute(
+                "DELETE FROM quiz_attempts WHERE id = ? RETURNING data, created_at", (attempt_id,)
+            ).fetchone()
+            self._conn.commit()
+            if row and time.time() - row[1] >= self.ttl:
+                self.stats["expired"] += 1
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["submitted"] += 1
+            return json.loads(row[0])
+
+    def _evict(self, now: float) -> None:
+        """Drop expired attempts, then least recently used ones over the caps."""
+        self.stats["expired"] += self._conn.execute(
+            "DELETE FROM quiz_attempts WHERE created_at <= ?", (now - self.ttl,)
+        ).rowcount
+        self.stats["evicted"] += self._conn.execute(
+            "DELETE FROM quiz_attempts WHERE id IN ("
+            "SELECT id FROM (SELECT id, "
+            "ROW_NUMBER() OVER (ORDER BY accessed_at DESC, id) AS n, "
+            "SUM(size) OVER (ORDER BY accessed_at DESC, id) AS total "
+            "FROM quiz_attempts) WHERE n > ? OR total > ?)",
+            (self.max_attempts, self.max_bytes)
+        ).rowcount
+
+    def clear(self) -> None:
+        """Drop every attempt."""
+        with self._lock:
+            self._conn.execute("DELETE FROM quiz_attempts")
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return this process's counters and the shared table's size."""
+        with self._lock:
+            attempts, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM quiz_attempts"
+            ).fetchone()
+            stats = dict(self.stats)
+        stats["attempts"] = attempts
+        stats["bytes"] = size
+        stats["backend"] = self.backend
+        return stats
+
+
+def make_quiz_store(backend: str = os.getenv("QUIZ_STORE_BACKEND", "memory")):
+    """Create the attempt store selected by QUIZ_STORE_BACKEND (memory or sqlite)."""
+    ttl = int(os.getenv("QUIZ_ATTEMPT_TTL", "3600"))
+    max_attempts = int(os.getenv("QUIZ_STORE_MAX_ATTEMPTS", "10000"))
+    max_bytes = int(os.getenv("QUIZ_STORE_MAX_BYTES", str(50 * 1024 * 1024)))
+    if backend == "sqlite":
+        path = os.getenv("QUIZ_STORE_PATH", "./quiz_attempts.db")
+        return SQLiteQuizStore(path, ttl, max_attempts, max_bytes)
+    if backend == "memory":
+        return MemoryQuizStore(ttl, max_attempts, max_bytes)
+    raise ValueError(f"Unknown QUIZ_STORE_BACKEND '{backend}', expected memory or sqlite")
+
+
+# Global quiz attempt store instance
+quiz_store = make_quiz_store()
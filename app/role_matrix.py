@@ -0,0 +1,106 @@
+"""Vectorized fit of one user's skills against every role's requirements."""
+import threading
+from typing import Dict, List, Any, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.catalog_cache import catalog_cache, CatalogSnapshot
+from app.gap_engine import normalize_skill_name
+
+
+class RoleMatrix:
+    """
+    Role requirements as a (roles x skills) matrix over a shared vocabulary.
+
+    The matrix is rebuilt only when the catalog changes: refresh() reuses
+    it for as long as the catalog cache returns the same snapshot.
+    """
+
+    def __init__(self):
+        """Initialize an empty matrix."""
+        self._names: List[str] = []
+        self._vocab: Dict[str, int] = {}
+        self._labels: List[Dict[int, str]] = []
+        self._matrix = np.zeros((0, 0))
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Force a rebuild on the next refresh."""
+        with self._lock:
+            self._snapshot = None
+
+    def refresh(self, db: Session) -> None:
+        """Rebuild the matrix if the catalog changed since the last build."""
+        snapshot = catalog_cache.get(db)
+        if snapshot is self._snapshot:
+            return
+
+        roles = [(role.name, role.requirements) for role in snapshot.roles]
+        vocab: Dict[str, int] = {}
+        for _, requirements in roles:
+            for skill in requirements:
+                vocab.setdefault(normalize_skill_name(skill), len(vocab))
+
+        matrix = np.zeros((len(roles), len(vocab)))
+        labels = []
+        for row, (_, requirements) in enumerate(roles):
+            role_labels = {}
+            for skill, required in requirements.items():
+                column = vocab[normalize_skill_name(skill)]
+                matrix[row, column] = max(matrix[row, column], required)
+                role_labels[column] = skill
+            labels.append(role_labels)
+
+        with self._lock:
+            self._names = [name for name, _ in roles]
+            self._vocab = vocab
+            self._labels = labels
+            self._matrix = matrix
+            self._snapshot = snapshot
+
+    def rank(self, user_skills: List[Dict[str, Any]], k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Score a user against every role and return the k best fits.
+
+        fit_score is computed as in gap_engine.compute_gap: the share of
+        required levels the user meets, ignoring levels above a requirement.
+
+        Returns:
+            Roles by descending fit_score, each with its per-skill deficits
+        """
+        with self._lock:
+            names, vocab, labels, matrix = self._names, self._vocab, self._labels, self._matrix
+
+        levels = np.zeros(len(vocab))
+        for skill in user_skills:
+            column = vocab.get(normalize_skill_name(skill["name"]))
+            if column is not None:
+                levels[column] = max(levels[column], skill["level"])
+
+        totals = matrix.sum(axis=1)
+        earned = np.minimum(matrix, levels).sum(axis=1)
+        scores = np.divide(100 * earned, totals, out=np.full(len(names), 100.0), where=totals > 0)
+        deficits = np.clip(matrix - levels, 0, None)
+
+        ranked = []
+        for row in np.argsort(-scores, kind="stable")[:k]:
+            columns = np.flatnonzero(deficits[row])
+            columns = columns[np.argsort(-deficits[row, columns], kind="stable")]
+            ranked.append({
+                "role": names[row],
+                "fit_score": round(float(scores[row])),
+                "deficits": [
+                    {
+                        "skill": labels[row][column],
+                        "required": int(matrix[row, column]),
+                        "user_level": int(levels[column]),
+                        "deficit": int(deficits[row, column])
+                    }
+                    for column in columns
+                ]
+            })
+        return ranked
+
+
+# Global role matrix instance
+role_matrix = RoleMatrix()
@@ -1,70 +1,432 @@
 """Skill gap analysis routes."""
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import json
+import asyncio
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app import schemas, crud
-from app.db import get_db
-from app.ai_client import ai_client
+from app import schemas, crud, models, gap_engine
+from app.db import get_read_db
+from app.ai_client import async_ai_client
+from app.analysis_cache import analysis_cache, make_key
+from app.json_stream import SectionParser
+from app.llm_output import output_stats, parse_analysis, parse_narrative
+from app.course_index import course_index
+from app.single_flight import analysis_flight
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
+# Top-level sections of an analysis result, in the order they are rendered
+SECTIONS = ["analysis", "recommendations", "study_plan"]
 
-@router.post("/")
-def analyze_skill_gap(request: schemas.AnalysisRequest, db: Session = Depends(get_db)):
+# Default number of analyses a batch request runs at once
+BATCH_CONCURRENCY = int(os.getenv("ANALYSIS_BATCH_CONCURRENCY", "8"))
+
+
+def build_profile(user: models.User) -> Dict[str, Any]:
+    """Convert a user's skills, certifications and achievements to AI input dicts."""
+    return {
+        "user_skills": [{"name": skill.name, "level": skill.level} for skill in user.skills],
+        "user_certifications": [
+            {
+                "name": cert.name,
+                "issuer": cert.issuer,
+                "date_obtained": cert.date_obtained
+            }
+            for cert in user.certifications
+        ],
+        "user_achievements": [
+            {
+                "title": achievement.title,
+                "description": achievement.description,
+                "date": achievement.date
+            }
+            for achievement in user.achievements
+        ]
+    }
+
+
+def select_course_catalog(
+    profile: Dict[str, Any],
+    target_role: str,
+    requirements: Optional[Dict[str, int]],
+    mode: str
+) -> list:
     """
-    Perform AI-powered skill gap analysis.
-    
-    Analyzes user's complete profile (skills, certifications, achievements)
-    against target role and generates personalized recommendations.
+    Pick the courses an analysis draws on.
+
+    The gap engine (fast and hybrid modes) gets every course for the role's
+    required skills, so no gap loses its recommendation; only an AI prompt
+    is cut to the top-k courses relevant to the role and the user's gaps.
     """
-    if not ai_client.is_configured():
-        return {"error": "GROQ_API_KEY not configured"}
+    if mode != "ai":
+        return course_index.courses_for(requirements or {})
+    return course_index.select_for_analysis(profile["user_skills"], target_role, requirements)
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters and sizes for the analysis result cache."""
+    return analysis_cache.get_stats()
+
 
+@router.get("/output/stats")
+def output_parse_stats():
+    """How often analysis and narrative output parsed clean, needed repair or salvage, or failed."""
+    return output_stats.get_stats(["analysis", "narrative"])
+
+
+@router.get("/coalescing/stats")
+def coalescing_stats():
+    """How many AI analyses and narratives ran versus joined an identical one in flight."""
+    return analysis_flight.get_stats()
+
+
+def load_analysis_inputs(
+    db: Session,
+    request: schemas.AnalysisRequest,
+    mode: str
+) -> Tuple[Dict[str, Any], list, Optional[Dict[str, int]], str]:
+    """
+    Load the user profile, course catalog and role for an analysis.
+
+    Returns:
+        (profile, course_catalog, requirements, mode) where mode may fall
+        back from hybrid to ai for custom roles
+    """
     # Get user with skills, certifications, and achievements
-    user = crud.get_user(db, user_id=request.user_id)
+    user = crud.get_user(db, user_id=request.user_id, load="joined")
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get all courses
-    courses = crud.get_courses(db)
-
-    # Prepare data for AI
-    user_skills = [{"name": skill.name, "level": skill.level} for skill in user.skills]
-    
-    user_certifications = [
-        {
-            "name": cert.name,
-            "issuer": cert.issuer,
-            "date_obtained": cert.date_obtained
-        }
-        for cert in user.certifications
-    ]
-    
-    user_achievements = [
-        {
-            "title": achievement.title,
-            "description": achievement.description,
-            "date": achievement.date
-        }
-        for achievement in user.achievements
-    ]
-    
-    course_catalog = [
-        {
-            "title": course.title,
-            "provider": course.provider,
-            "level": course.level,
-            "related_skill": course.related_skill
-        }
-        for course in courses
-    ]
-
-    # Generate analysis using AI
-    result = ai_client.generate_skill_gap_analysis(
-        user_skills=user_skills,
-        user_certifications=user_certifications,
-        user_achievements=user_achievements,
-        target_role=request.role,
-        course_catalog=course_catalog
+    role = crud.get_role_by_name(db, name=request.role)
+    if mode == "fast" and role is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+    if mode == "hybrid" and role is None:
+        if not async_ai_client.is_configured():
+            raise HTTPException(status_code=404, detail="Role not found")
+        mode = "ai"
+
+    profile = build_profile(user)
+    requirements = dict(role.requirements) if role else None
+    course_index.refresh(db)
+    course_catalog = select_course_catalog(profile, request.role, requirements, mode)
+
+    # Release the pooled connection before the route awaits the LLM
+    db.close()
+    return profile, course_catalog, requirements, mode
+
+
+async def run_analysis(
+    target_role: str,
+    mode: str,
+    profile: Dict[str, Any],
+    course_catalog: list,
+    requirements: Optional[Dict[str, int]]
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Run one analysis for already loaded inputs, using the result cache.
+
+    Returns:
+        (result, cache_status) where cache_status is the Cache-Status header
+        value, or None in fast mode
+    """
+    if mode == "fast":
+        return gap_engine.analyze(
+            user_skills=profile["user_skills"],
+            requirements=requirements,
+            target_role=target_role,
+            course_catalog=course_catalog
+        ), None
+
+    cache_key = make_key(
+        target_role=target_role,
+        requirements=requirements,
+        course_catalog=course_catalog,
+        mode=mode,
+        model=async_ai_client.model,
+        **profile
+    )
+    cached, tier = await run_in_threadpool(analysis_cache.get, cache_key)
+    if cached is not None:
+        return cached, f"skill-manager; hit; detail={tier}"
+
+    if mode == "ai":
+        # Generate analysis using AI
+        result = await async_ai_client.generate_skill_gap_analysis(
+            target_role=target_role,
+            course_catalog=course_catalog,
+            requirements=requirements,
+            **profile
+        )
+    else:
+        result = gap_engine.analyze(
+            user_skills=profile["user_skills"],
+            requirements=requirements,
+            target_role=target_role,
+            course_catalog=course_catalog
+        )
+        if async_ai_client.is_configured():
+            narrative = await async_ai_client.generate_gap_narrative(
+                target_role=target_role,
+                analysis=result["analysis"],
+                recommendations=result["recommendations"],
+                requirements=requirements,
+                **profile
+            )
+            if "error" not in narrative:
+                result["analysis"]["overall_assessment"] = narrative.get(
+                    "overall_assessment", result["analysis"]["overall_assessment"]
+                )
+                result["study_plan"] = narrative.get("study_plan", result["study_plan"])
+                result["ai_used"] = True
+                result["prompt_tokens"] = narrative["prompt_tokens"]
+
+    if result.get("ai_used") and "error" not in result and not result.get("incomplete"):
+        await run_in_threadpool(analysis_cache.set, cache_key, result)
+        return result, "skill-manager; fwd=miss; stored"
+    return result, "skill-manager; fwd=miss"
+
+
+@router.post("/")
+async def analyze_skill_gap(
+    request: schemas.AnalysisRequest,
+    response: Response,
+    mode: str = Query("ai", pattern="^(fast|ai|hybrid)$"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Perform skill gap analysis.
+
+    Modes:
+    - ai: the LLM analyzes the complete profile (skills, certifications,
+      achievements) against the target role and generates recommendations.
+    - fast: missing/underdeveloped skills, fit score, course recommendations
+      and study plan are computed locally from the role's requirements.
+    - hybrid: the analysis block and recommendations are computed locally and
+      the LLM only writes the overall assessment and study plan.
+
+    fast and hybrid require the role to exist; hybrid falls back to ai for
+    custom roles.
+
+    AI and hybrid results are cached by profile, role and course catalog;
+    the Cache-Status response header reports hit (memory or disk) or miss.
+    """
+    if mode == "ai" and not async_ai_client.is_configured():
+        return {"error": "GROQ_API_KEY not configured"}
+
+    # Database work runs in the threadpool; the AI call awaits on the event loop
+    profile, course_catalog, requirements, mode = await run_in_threadpool(load_analysis_inputs, db, request, mode)
+
+    result, cache_status = await run_analysis(request.role, mode, profile, course_catalog, requirements)
+    if cache_status:
+        response.headers["Cache-Status"] = cache_status
+    return result
+
+
+def sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_analysis_events(
+    request: schemas.AnalysisRequest,
+    mode: str,
+    profile: Dict[str, Any],
+    course_catalog: list,
+    requirements: Optional[Dict[str, int]],
+    cache_key: Optional[str],
+    cached: Optional[Dict[str, Any]]
+) -> AsyncIterator[str]:
+    """
+    Produce the SSE stream for a gap analysis.
+
+    Events:
+    - token: {"text": ...} raw model output as it arrives
+    - section: {"name": ..., "value": ...} once a section is parseable;
+      names are analysis, recommendations, study_plan and, in hybrid mode,
+      overall_assessment
+    - error: {"error": ...} if the model call fails
+    - done: the complete result, same shape as POST /analysis/
+    """
+    if cached is not None:
+        for name in SECTIONS:
+            yield sse("section", {"name": name, "value": cached.get(name)})
+        yield sse("done", cached)
+        return
+
+    if mode != "ai":
+        result = gap_engine.analyze(
+            user_skills=profile["user_skills"],
+            requirements=requirements,
+            target_role=request.role,
+            course_catalog=course_catalog
+        )
+        names = SECTIONS if mode == "fast" or not async_ai_client.is_configured() else SECTIONS[:2]
+        for name in names:
+            yield sse("section", {"name": name, "value": result[name]})
+        if names == SECTIONS:
+            yield sse("done", result)
+            return
+        chunks = async_ai_client.stream_gap_narrative(
+            target_role=request.role,
+            analysis=result["analysis"],
+            recommendations=result["recommendations"],
+            **profile
+        )
+    else:
+        result = None
+        chunks = async_ai_client.stream_skill_gap_analysis(
+            target_role=request.role,
+            course_catalog=course_catalog,
+            requirements=requirements,
+            **profile
+        )
+
+    parser = SectionParser()
+    content = []
+    try:
+        async for text in chunks:
+            content.append(text)
+            yield sse("token", {"text": text})
+            for name, value in parser.feed(text):
+                yield sse("section", {"name": name, "value": value})
+        parsed = parse_analysis("".join(content)) if result is None else parse_narrative("".join(content))
+    except Exception as e:
+        yield sse("error", {"error": str(e)})
+        if result is None:
+            result = async_ai_client.analysis_error(e)
+        else:
+            yield sse("section", {"name": "study_plan", "value": result["study_plan"]})
+        yield sse("done", result)
+        return
+
+    if result is None:
+        result = parsed
+    else:
+        result["analysis"]["overall_assessment"] = parsed.get(
+            "overall_assessment", result["analysis"]["overall_assessment"]
+        )
+        result["study_plan"] = parsed.get("study_plan", result["study_plan"])
+    result["ai_used"] = True
+
+    if not result.get("incomplete"):
+        await run_in_threadpool(analysis_cache.set, cache_key, result)
+    yield sse("done", result)
+
+
+@router.post("/stream")
+async def stream_skill_gap(
+    request: schemas.AnalysisRequest,
+    mode: str = Query("ai", pattern="^(fast|ai|hybrid)$"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream a skill gap analysis as Server-Sent Events.
+
+    Accepts the same body and modes as POST /analysis/. Model tokens are
+    relayed as they arrive and each top-level section is sent as soon as
+    it can be parsed, so clients can render progressively.
+    """
+    if mode == "ai" and not async_ai_client.is_configured():
+        return {"error": "GROQ_API_KEY not configured"}
+
+    profile, course_catalog, requirements, mode = await run_in_threadpool(load_analysis_inputs, db, request, mode)
+
+    cache_key = None
+    cached = None
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if mode != "fast":
+        cache_key = make_key(
+            target_role=request.role,
+            requirements=requirements,
+            course_catalog=course_catalog,
+            mode=mode,
+            model=async_ai_client.model,
+            **profile
+        )
+        cached, tier = await run_in_threadpool(analysis_cache.get, cache_key)
+        headers["Cache-Status"] = f"skill-manager; hit; detail={tier}" if cached else "skill-manager; fwd=miss"
+
+    return StreamingResponse(
+        stream_analysis_events(request, mode, profile, course_catalog, requirements, cache_key, cached),
+        media_type="text/event-stream",
+        headers=headers
     )
 
-    return result
\ No newline at end of file
+
+def load_batch_inputs(
+    db: Session,
+    request: schemas.BatchAnalysisRequest,
+    mode: str
+) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, Dict[str, int]]]:
+    """
+    Load every requested profile and role in bulk and refresh the course index.
+
+    Returns:
+        (profiles by user ID, requirements by role name)
+    """
+    users = crud.get_users_by_ids(db, list(set(request.user_ids)))
+    profiles = {user.id: build_profile(user) for user in users}
+    course_index.refresh(db)
+    roles = crud.get_roles_by_names(db, list(set(request.roles)))
+    requirements = {role.name: dict(role.requirements) for role in roles}
+
+    # Release the pooled connection before the batch awaits the LLM
+    db.close()
+    return profiles, requirements
+
+
+@router.post("/batch")
+async def analyze_batch(
+    request: schemas.BatchAnalysisRequest,
+    mode: str = Query("ai", pattern="^(fast|ai|hybrid)$"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Analyze every user in user_ids against every role in roles.
+
+    Profiles and roles are loaded with a handful of bulk queries,
+    then analyses run with at most `concurrency` in flight (default
+    ANALYSIS_BATCH_CONCURRENCY). Results stream back as NDJSON, one line per
+    (user_id, role) pair in completion order, each with either a result or
+    an error.
+    """
+    if mode == "ai" and not async_ai_client.is_configured():
+        return {"error": "GROQ_API_KEY not configured"}
+
+    profiles, requirements = await run_in_threadpool(load_batch_inputs, db, request, mode)
+    semaphore = asyncio.Semaphore(request.concurrency or BATCH_CONCURRENCY)
+
+    async def analyze_one(user_id: int, role: str) -> Dict[str, Any]:
+        item = {"user_id": user_id, "role": role}
+        item_mode = mode
+        if user_id not in profiles:
+            return dict(item, error="User not found")
+        if mode != "ai" and role not in requirements:
+            if mode == "fast" or not async_ai_client.is_configured():
+                return dict(item, error="Role not found")
+            item_mode = "ai"
+        course_catalog = select_course_catalog(profiles[user_id], role, requirements.get(role), item_mode)
+        async with semaphore:
+            result, cache_status = await run_analysis(
+                role, item_mode, profiles[user_id], course_catalog, requirements.get(role)
+            )
+        if "error" in result:
+            return dict(item, error=result["error"])
+        return dict(item, result=result, cache_status=cache_status)
+
+    async def lines() -> AsyncIterator[str]:
+        pairs = dict.fromkeys((user_id, role) for user_id in request.user_ids for role in request.roles)
+        tasks = [asyncio.ensure_future(analyze_one(user_id, role)) for user_id, role in pairs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Stop outstanding analyses if the client disconnects
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,20 +1,58 @@
 """Courses routes."""
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
-from app import schemas, crud
-from app.db import get_db
+from app import schemas, crud, versions
+from app.db import get_db, get_read_db
+from app.bulk_import import BULK_OPENAPI, read_rows, validate_rows
+from app.catalog_cache import catalog_cache
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
 
 @router.get("/", response_model=List[schemas.Course])
-def list_courses(db: Session = Depends(get_db)):
-    """List all available courses."""
-    return crud.get_courses(db)
+def list_courses(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """
+    List all available courses. Supports If-None-Match with the returned ETag.
+
+    The body is serialized once per catalog version and served from the
+    process-local catalog cache.
+    """
+    snapshot = catalog_cache.get(db)
+    etag = versions.make_etag(versions.CATALOG, snapshot.version)
+    cached = versions.not_modified(request, response, etag, versions.CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+    return versions.json_response(snapshot.courses_json, response)
 
 
 @router.post("/", response_model=schemas.Course, status_code=201)
 def create_course(course: schemas.CourseCreate, db: Session = Depends(get_db)):
     """Add a new course."""
-    return crud.create_course(db=db, course=course)
\ No newline at end of file
+    return crud.create_course(db=db, course=course)
+
+
+@router.post("/bulk", response_model=schemas.BulkImportResult, openapi_extra=BULK_OPENAPI)
+async def bulk_import_courses(
+    request: Request,
+    upsert: bool = True,
+    atomic: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Import courses in a single transaction.
+
+    The body is a JSON array, NDJSON or CSV (by Content-Type).
+    CSV columns: title,provider,level,related_skill. Existing courses match
+    on title.
+
+    Rows are written with batched executemany statements. Invalid rows are
+    reported by row number; with atomic=true any error aborts the import.
+    """
+    rows, errors = validate_rows(await read_rows(request), schemas.CourseCreate)
+    if errors and atomic:
+        return {"inserted": 0, "updated": 0, "errors": errors}
+    result = await run_in_threadpool(crud.bulk_upsert_courses, db, rows, upsert, atomic)
+    result["errors"] = sorted(errors + result["errors"], key=lambda e: e["row"])
+    return result
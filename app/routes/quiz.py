@@ -1,32 +1,69 @@
 """Quiz routes for self-assessment."""
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app import schemas
-from app.ai_client import ai_client
+from app.ai_client import ai_client, async_ai_client
+from app.gap_engine import normalize_skill_name
+from app.quiz_pool import quiz_pool
+from app.quiz_store import quiz_store
+from app.llm_output import output_stats
+from app.single_flight import quiz_flight
 
 router = APIRouter(prefix="/quiz", tags=["quiz"])
 
-# Store active quizzes in memory (in production, use Redis or database)
-active_quizzes = {}
+
+@router.get("/pool/stats")
+def pool_stats():
+    """Hit/miss counters and depth of the pre-generated quiz pool."""
+    return quiz_pool.get_stats()
+
+
+@router.get("/attempts/stats")
+def attempt_stats():
+    """Counters and current size of the quiz attempt store."""
+    return quiz_store.get_stats()
+
+
+@router.get("/coalescing/stats")
+def coalescing_stats():
+    """How many quiz generations ran versus joined an identical one in flight."""
+    return quiz_flight.get_stats()
+
+
+@router.get("/output/stats")
+def output_parse_stats():
+    """How often quiz output parsed clean, needed repair or salvage, or failed."""
+    return output_stats.get_stats(["quiz"])
+
+
+@router.get("/attempts/{attempt_id}")
+def get_attempt(attempt_id: str):
+    """Return the questions of an unsubmitted attempt, e.g. to resume it."""
+    attempt = quiz_store.get(attempt_id)
+    if attempt is None:
+        raise HTTPException(status_code=404, detail="Quiz attempt not found or expired")
+    return {"attempt_id": attempt_id, "skill": attempt["skill"], "questions": attempt["questions"]}
 
 
 @router.get("/{skill}")
-def generate_quiz(skill: str):
+async def generate_quiz(skill: str):
     """
     Generate an AI-powered self-assessment quiz for a skill.
     
-    Returns 4 multiple-choice questions with varying difficulty levels.
+    Returns 4 multiple-choice questions with varying difficulty levels and
+    the attempt_id to submit answers against. Served from the pre-generated
+    pool when available.
     """
-    if not ai_client.is_configured():
+    if not async_ai_client.is_configured():
         return {"error": "GROQ_API_KEY not configured"}
 
-    result = ai_client.generate_quiz(skill)
+    result = quiz_pool.pop(skill)
+    if result is None:
+        result = await async_ai_client.generate_quiz(skill)
     
     if "error" not in result:
         # Store quiz data for later scoring
-        active_quizzes[skill] = {
-            "correct_answers": [q["correct"] for q in result["questions"]],
-            "questions": result["questions"]
-        }
+        result["attempt_id"] = await run_in_threadpool(quiz_store.create, skill, result["questions"])
     
     return result
 
@@ -42,16 +79,19 @@ def submit_quiz(skill: str, submission: schemas.QuizSubmission):
     if not ai_client.is_configured():
         return {"error": "GROQ_API_KEY not configured"}
 
-    if skill not in active_quizzes:
-        return {"error": "No active quiz found for this skill. Generate a quiz first."}
+    if not submission.attempt_id:
+        return {"error": "attempt_id is required. Use the one returned when the quiz was generated."}
+
+    quiz_data = quiz_store.get(submission.attempt_id)
+    if quiz_data and normalize_skill_name(quiz_data["skill"]) != normalize_skill_name(skill):
+        return {"error": f"Attempt {submission.attempt_id} is a quiz for '{quiz_data['skill']}', not '{skill}'."}
+
+    # Taking the attempt out of the store makes each attempt scorable once
+    quiz_data = quiz_store.pop(submission.attempt_id)
+    if quiz_data is None:
+        return {"error": "No active quiz found for this attempt. Generate a quiz first."}
 
-    quiz_data = active_quizzes[skill]
     correct_answers = quiz_data["correct_answers"]
     questions = quiz_data["questions"]
     
-    result = ai_client.score_quiz(submission.answers, correct_answers, questions)
-    
-    # Clean up
-    del active_quizzes[skill]
-    
-    return result
\ No newline at end of file
+    return ai_client.score_quiz(submission.answers, correct_answers, questions)
\ No newline at end of file
@@ -1,17 +1,60 @@
 """Roles routes."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Request, Response, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
-from app import schemas, crud
-from app.db import get_db
+from app import schemas, crud, versions
+from app.db import get_db, get_read_db
+from app.bulk_import import BULK_OPENAPI, read_rows, validate_rows
+from app.catalog_cache import catalog_cache
+from app.skill_index import skill_index
 
 router = APIRouter(prefix="/roles", tags=["roles"])
 
 
 @router.get("/", response_model=List[schemas.Role])
-def list_roles(db: Session = Depends(get_db)):
-    """List all available roles."""
-    return crud.get_roles(db)
+def list_roles(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """
+    List all available roles. Supports If-None-Match with the returned ETag.
+
+    The body is serialized once per catalog version and served from the
+    process-local catalog cache.
+    """
+    snapshot = catalog_cache.get(db)
+    etag = versions.make_etag(versions.CATALOG, snapshot.version)
+    cached = versions.not_modified(request, response, etag, versions.CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+    return versions.json_response(snapshot.roles_json, response)
+
+
+@router.get("/cache/stats")
+def get_catalog_cache_stats():
+    """Get catalog cache statistics for this process."""
+    return catalog_cache.get_stats()
+
+
+@router.get("/{name}/candidates", response_model=schemas.CandidateList)
+def list_candidates(
+    name: str,
+    k: int = Query(20, ge=1, le=1000, description="Number of candidates to return"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Rank users by fit for a role.
+
+    Users get partial credit for every required skill they have, so those
+    missing some skills still rank. `met` counts requirements fully met.
+    """
+    db_role = crud.get_role_by_name(db, name=name)
+    if db_role is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+    skill_index.refresh(db)
+    return {
+        "role": db_role.name,
+        "requirements": len(db_role.requirements),
+        "candidates": skill_index.rank(db_role.requirements, k)
+    }
 
 
 @router.post("/", response_model=schemas.Role, status_code=201)
@@ -20,4 +63,29 @@ def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
     db_role = crud.get_role_by_name(db, name=role.name)
     if db_role:
         raise HTTPException(status_code=400, detail="Role already exists")
-    return crud.create_role(db=db, role=role)
\ No newline at end of file
+    return crud.create_role(db=db, role=role)
+
+
+@router.post("/bulk", response_model=schemas.BulkImportResult, openapi_extra=BULK_OPENAPI)
+async def bulk_import_roles(
+    request: Request,
+    upsert: bool = True,
+    atomic: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Import roles in a single transaction.
+
+    The body is a JSON array, NDJSON or CSV (by Content-Type).
+    CSV columns: name,requirements where requirements is a JSON object or
+    "python:4;sql:3". Existing roles match on name.
+
+    Rows are written with batched executemany statements. Invalid rows are
+    reported by row number; with atomic=true any error aborts the import.
+    """
+    rows, errors = validate_rows(await read_rows(request), schemas.RoleCreate)
+    if errors and atomic:
+        return {"inserted": 0, "updated": 0, "errors": errors}
+    result = await run_in_threadpool(crud.bulk_upsert_roles, db, rows, upsert, atomic)
+    result["errors"] = sorted(errors + result["errors"], key=lambda e: e["row"])
+    return result
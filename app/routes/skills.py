@@ -1,12 +1,49 @@
 """Skills routes."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app import schemas, crud
-from app.db import get_db
+from typing import List
+from app import schemas, crud, models
+from app.db import get_db, get_read_db
+from app.bulk_import import BULK_OPENAPI, read_rows, validate_rows
+from app.skill_vocabulary import skill_vocabulary, normalize_skill_key
 
 router = APIRouter(prefix="/skills", tags=["skills"])
 
 
+def serialize_canonical_skill(skill: models.CanonicalSkill) -> dict:
+    """Serialize a vocabulary entry with its alias strings."""
+    return {"id": skill.id, "name": skill.name, "aliases": sorted(alias.alias for alias in skill.aliases)}
+
+
+@router.get("/vocabulary", response_model=List[schemas.CanonicalSkill])
+def list_vocabulary(db: Session = Depends(get_read_db)):
+    """List canonical skill names and the aliases that resolve to them."""
+    return [serialize_canonical_skill(skill) for skill in crud.get_skill_vocabulary(db)]
+
+
+@router.get("/vocabulary/stats")
+def vocabulary_stats():
+    """Vocabulary size and hit rate of the skill name resolver cache."""
+    return skill_vocabulary.get_stats()
+
+
+@router.post("/vocabulary", response_model=schemas.CanonicalSkill, status_code=201)
+def add_vocabulary(entry: schemas.CanonicalSkillCreate, db: Session = Depends(get_db)):
+    """
+    Add a canonical skill or new aliases for an existing one.
+
+    Skill names written afterwards resolve through the aliases; run
+    scripts/backfill_skill_names.py to rewrite existing rows.
+    """
+    name = normalize_skill_key(entry.name)
+    owners = crud.get_alias_owners(db, [entry.name] + entry.aliases)
+    conflicts = sorted(alias for alias, owner in owners.items() if owner != name)
+    if conflicts:
+        raise HTTPException(status_code=400, detail=f"Already used by another skill: {', '.join(conflicts)}")
+    return serialize_canonical_skill(crud.create_canonical_skill(db, entry))
+
+
 @router.post("/users/{user_id}", response_model=schemas.Skill, status_code=201)
 def add_skill(user_id: int, skill: schemas.SkillCreate, db: Session = Depends(get_db)):
     """Add a skill to a user."""
@@ -31,4 +68,29 @@ def delete_skill(skill_id: int, db: Session = Depends(get_db)):
     success = crud.delete_skill(db, skill_id=skill_id)
     if not success:
         raise HTTPException(status_code=404, detail="Skill not found")
-    return None
\ No newline at end of file
+    return None
+
+
+@router.post("/bulk", response_model=schemas.BulkImportResult, openapi_extra=BULK_OPENAPI)
+async def bulk_import_skills(
+    request: Request,
+    upsert: bool = True,
+    atomic: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Import skills for many users in a single transaction.
+
+    The body is a JSON array, NDJSON or CSV (by Content-Type).
+    CSV columns: user_id,name,level. Existing skills match on user and
+    case-insensitive name; upserts update the level.
+
+    Rows are written with batched executemany statements. Invalid rows are
+    reported by row number; with atomic=true any error aborts the import.
+    """
+    rows, errors = validate_rows(await read_rows(request), schemas.SkillBulkCreate)
+    if errors and atomic:
+        return {"inserted": 0, "updated": 0, "errors": errors}
+    result = await run_in_threadpool(crud.bulk_upsert_skills, db, rows, upsert, atomic)
+    result["errors"] = sorted(errors + result["errors"], key=lambda e: e["row"])
+    return result
@@ -1,12 +1,71 @@
 """User routes."""
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app import schemas, crud
-from app.db import get_db
+from typing import List, Dict, Any, Optional
+from app import schemas, crud, models, versions
+from app.db import get_db, get_read_db
+from app.role_matrix import role_matrix
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+RELATIONSHIP_SCHEMAS = {
+    "skills": schemas.Skill,
+    "certifications": schemas.Certification,
+    "achievements": schemas.Achievement,
+}
+
+
+def encode_cursor(user_id: int) -> str:
+    """Encode the last seen user ID as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps({"id": user_id}).encode()).decode().rstrip("=")
+
+
+def set_next_cursor(response: Response, last_id: int) -> None:
+    """
+    Advertise the next page of a keyset-paged listing.
+
+    Every paged user endpoint returns its cursor the same way, in the
+    X-Next-Cursor header, absent on the last page.
+    """
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_id)
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_list(value: Optional[str], allowed: tuple, name: str) -> Optional[List[str]]:
+    """Parse a comma-separated query parameter, rejecting unknown names."""
+    if value is None:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {name}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    return items
+
+
+def serialize_user(user: models.User, fields: List[str], include: List[str]) -> Dict[str, Any]:
+    """Serialize only the selected fields and relationships of a user."""
+    data = {field: getattr(user, field) for field in fields}
+    for name in include:
+        schema = RELATIONSHIP_SCHEMAS[name]
+        data[name] = [schema.model_validate(row).model_dump() for row in getattr(user, name)]
+    return data
+
 
 @router.post("/", response_model=schemas.User, status_code=201)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -17,17 +76,111 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 
+@router.get("/search", response_model=schemas.TalentSearchResult)
+def search_users(
+    response: Response,
+    skill: List[str] = Query(..., description="Repeatable skill:min_level predicate, e.g. python:4"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Find users who have every requested skill at or above its minimum level.
+
+    Example: `?skill=python:4&skill=sql:3`. Skill names match
+    case-insensitively. Results are user IDs in ascending order; like
+    GET /users/, the X-Next-Cursor response header carries the cursor of
+    the next page when more users match.
+    """
+    predicates = []
+    for item in skill:
+        name, _, level = item.rpartition(":")
+        if not name.strip() or not level.isdigit() or not 1 <= int(level) <= 5:
+            raise HTTPException(status_code=400, detail=f"Invalid skill predicate '{item}', expected name:level (1-5)")
+        predicates.append((name, int(level)))
+
+    user_ids = crud.search_users_by_skills(
+        db, predicates, after_id=decode_cursor(cursor) if cursor else 0, limit=limit + 1
+    )
+    if len(user_ids) > limit:
+        user_ids = user_ids[:limit]
+        set_next_cursor(response, user_ids[-1])
+    return {"user_ids": user_ids}
+
+
 @router.get("/{user_id}", response_model=schemas.User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID with their skills."""
-    db_user = crud.get_user(db, user_id=user_id)
+def get_user(user_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Get user by ID with their skills. Supports If-None-Match with the returned ETag."""
+    version = versions.get_user_version(db, user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    etag = versions.make_etag(versions.user_key(user_id), version)
+    cached = versions.not_modified(request, response, etag, versions.PROFILE_CACHE_CONTROL)
+    if cached:
+        return cached
+    db_user = crud.get_user(db, user_id=user_id, load="joined")
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 
-@router.get("/", response_model=List[schemas.User])
-def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """List all users."""
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
\ No newline at end of file
+@router.get("/{user_id}/role-fit", response_model=schemas.RoleFitResult)
+def get_role_fit(
+    user_id: int,
+    k: int = Query(5, ge=1, le=100, description="Number of best-fitting roles to return"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Rank every role by how well the user's skills meet its requirements.
+
+    Scores all roles in one vectorized pass without calling the LLM. Each
+    role lists the skills the user falls short of, largest deficit first.
+    """
+    db_user = crud.get_user(db, user_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_skills = [{"name": s.name, "level": s.level} for s in db_user.skills]
+    role_matrix.refresh(db)
+    return {"user_id": user_id, "roles": role_matrix.rank(user_skills, k)}
+
+
+@router.get("/")
+def list_users(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of id,email,name,created_at"),
+    include: Optional[str] = Query(None, description="Comma-separated subset of skills,certifications,achievements"),
+    skip: int = Query(0, ge=0, description="Deprecated offset paging; use cursor"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List users ordered by ID using keyset pagination.
+
+    The X-Next-Cursor response header carries an opaque cursor when more
+    users exist; pass it back as `cursor` for the next page.
+
+    By default every field and relationship is returned. Passing `fields`
+    limits the columns and, unless `include` is also given, skips the
+    relationships entirely, e.g. `?fields=id,name,email`.
+    """
+    selected_fields = parse_list(fields, crud.USER_FIELDS, "fields") or list(crud.USER_FIELDS)
+    selected_include = parse_list(include, crud.USER_INCLUDES, "include")
+    if selected_include is None:
+        selected_include = [] if fields is not None else list(crud.USER_INCLUDES)
+    if "id" not in selected_fields:
+        selected_fields.insert(0, "id")
+
+    users = crud.get_users_page(
+        db,
+        after_id=decode_cursor(cursor) if cursor else None,
+        skip=skip,
+        limit=limit + 1,
+        fields=selected_fields,
+        include=selected_include
+    )
+    if len(users) > limit:
+        users = users[:limit]
+        set_next_cursor(response, users[-1].id)
+
+    return [serialize_user(user, selected_fields, selected_include) for user in users]
@@ -1,7 +1,16 @@
 """Pydantic schemas for request/response validation."""
+import os
 from datetime import datetime
 from typing import List, Dict, Optional, Any
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Size caps of a batch analysis request; larger requests are rejected with 422
+BATCH_MAX_USERS = int(os.getenv("ANALYSIS_BATCH_MAX_USERS", "500"))
+BATCH_MAX_ROLES = int(os.getenv("ANALYSIS_BATCH_MAX_ROLES", "50"))
+BATCH_MAX_PAIRS = int(os.getenv("ANALYSIS_BATCH_MAX_PAIRS", "1000"))
 
 
 class UserCreate(BaseModel):
@@ -21,11 +30,29 @@ class SkillCreate(SkillBase):
     pass
 
 
+class SkillBulkCreate(SkillBase):
+    """Schema for one row of a bulk skill import."""
+    user_id: int
+
+
 class SkillUpdate(BaseModel):
     """Schema for updating a skill."""
     level: int = Field(ge=1, le=5)
 
 
+class CanonicalSkillCreate(BaseModel):
+    """Schema for adding a canonical skill and its aliases."""
+    name: str
+    aliases: List[str] = []
+
+
+class CanonicalSkill(BaseModel):
+    """Schema for canonical skill response."""
+    id: int
+    name: str
+    aliases: List[str]
+
+
 class Skill(SkillBase):
     """Schema for skill response."""
     id: int
@@ -91,6 +118,46 @@ class User(BaseModel):
         from_attributes = True
 
 
+class TalentSearchResult(BaseModel):
+    """Schema for talent search response; the next page's cursor is in the X-Next-Cursor header."""
+    user_ids: List[int]
+
+
+class SkillDeficit(BaseModel):
+    """Schema for a requirement a user falls short of."""
+    skill: str
+    required: int
+    user_level: int
+    deficit: int
+
+
+class RoleFit(BaseModel):
+    """Schema for a user's fit to one role."""
+    role: str
+    fit_score: int
+    deficits: List[SkillDeficit]
+
+
+class RoleFitResult(BaseModel):
+    """Schema for role-fit ranking response."""
+    user_id: int
+    roles: List[RoleFit]
+
+
+class Candidate(BaseModel):
+    """Schema for a user ranked against a role."""
+    user_id: int
+    fit_score: int
+    met: int
+
+
+class CandidateList(BaseModel):
+    """Schema for role candidate ranking response."""
+    role: str
+    requirements: int
+    candidates: List[Candidate]
+
+
 class RoleCreate(BaseModel):
     """Schema for creating a new role."""
     name: str
@@ -133,6 +200,21 @@ class AnalysisRequest(BaseModel):
     role: str
 
 
+class BatchAnalysisRequest(BaseModel):
+    """Schema for analyzing many users against many roles."""
+    user_ids: List[int] = Field(min_length=1, max_length=BATCH_MAX_USERS)
+    roles: List[str] = Field(min_length=1, max_length=BATCH_MAX_ROLES)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=64, description="Max analyses in flight")
+
+    @model_validator(mode="after")
+    def check_pairs(self) -> "BatchAnalysisRequest":
+        """Cap the number of (user, role) analyses one request can start."""
+        pairs = len(self.user_ids) * len(self.roles)
+        if pairs > BATCH_MAX_PAIRS:
+            raise ValueError(f"Batch of {pairs} (user, role) pairs exceeds the limit of {BATCH_MAX_PAIRS}")
+        return self
+
+
 class AnalysisResponse(BaseModel):
     """Schema for skill gap analysis response."""
     analysis: Dict[str, Any]
@@ -141,6 +223,13 @@ class AnalysisResponse(BaseModel):
     ai_used: bool
 
 
+class BulkImportResult(BaseModel):
+    """Schema for bulk import outcome."""
+    inserted: int
+    updated: int
+    errors: List[Dict[str, Any]]
+
+
 class QuizQuestion(BaseModel):
     """Schema for a quiz question."""
     q: str
@@ -153,11 +242,13 @@ class QuizResponse(BaseModel):
     """Schema for quiz generation response."""
     skill: str
     questions: List[QuizQuestion]
+    attempt_id: Optional[str] = None
 
 
 class QuizSubmission(BaseModel):
     """Schema for quiz answer submission."""
     answers: List[int]
+    attempt_id: Optional[str] = None
 
 
 class QuizResult(BaseModel):
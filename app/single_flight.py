@@ -0,0 +1,113 @@
+"""Single-flight coalescing of identical concurrent LLM calls."""
+import asyncio
+import threading
+from typing import Dict, Any, Callable, Awaitable, TypeVar
+from app import metrics
+
+T = TypeVar("T")
+
+llm_flight_calls = metrics.registry.register(metrics.Counter(
+    "llm_single_flight_calls_total", "Coalescable LLM calls by whether they led or joined a call.", ("kind", "role")
+))
+
+
+class _Call:
+    """One in-flight blocking call that followers wait on."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        """Start an unfinished call."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time and share its outcome.
+
+    The first caller with a key (the leader) runs the call; callers
+    arriving while it is in flight (followers) wait for it and get the
+    same result, or the same exception. Nothing is kept once the call
+    finishes, so this only merges overlapping calls; repeated requests
+    are for the caches to absorb.
+
+    Blocking and async callers are tracked separately. Async calls run in
+    their own task, so a leader whose request is cancelled (e.g. the client
+    disconnected) doesn't cancel the call for its followers.
+    """
+
+    def __init__(self, kind: str):
+        """
+        Args:
+            kind: Name of the call family, used in stats and metric labels
+        """
+        self.kind = kind
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _count(self, role: str) -> None:
+        """Count a caller as leader or follower."""
+        with self._lock:
+            self.stats[role + "s"] += 1
+        llm_flight_calls.inc(kind=self.kind, role=role)
+
+    def do(self, key: str, call: Callable[[], T]) -> T:
+        """Run a blocking call, or wait for the identical one already running."""
+        with self._lock:
+            pending = self._calls.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._calls[key] = _Call()
+        self._count("leader" if leader else "follower")
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = call()
+            return pending.result
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            pending.done.set()
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        """Drop a finished task, retrieving its exception in case every waiter was cancelled."""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def ado(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Await a call, or the identical one already running on this event loop."""
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self._count("leader" if leader else "follower")
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return leader/follower counters and the calls in flight."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls) + len(self._tasks)
+        total = stats["leaders"] + stats["followers"]
+        stats["coalesced_rate"] = round(stats["followers"] / total, 4) if total else 0.0
+        return stats
+
+
+# Global single-flight groups for quiz and gap analysis generation
+quiz_flight = SingleFlight("quiz")
+analysis_flight = SingleFlight("analysis")
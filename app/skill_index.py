@@ -0,0 +1,191 @@
+"""In-memory inverted index from skill name to the users holding it."""
+import threading
+from typing import Dict, List, Any, Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import models
+from app.gap_engine import normalize_skill_name
+
+# A skill held by at least 1/DENSE_RATIO of all user IDs is stored as one
+# int8 level per user ID, which is then smaller than sorted (user_id, level)
+# pairs and lets ranking use contiguous vector operations.
+DENSE_RATIO = 5
+
+
+class SkillIndex:
+    """
+    Per normalized skill name, the level of every user holding it.
+
+    Rare skills are stored sparsely as sorted user_id/level arrays, common
+    ones densely as a level array indexed by user_id. The index loads lazily
+    and is kept current by crud's skill create/update/delete paths. Like
+    the course index, refresh() picks up skills inserted by other processes
+    through a max(id) check; updates and deletes made by other processes are
+    seen after a restart or clear(). A user holding case variants of one
+    skill is indexed at the highest level.
+    """
+
+    def __init__(self):
+        """Initialize an empty, unloaded index."""
+        self._sparse: Dict[str, tuple] = {}
+        self._dense: Dict[str, np.ndarray] = {}
+        self._max_id = 0
+        self._max_user_id = 0
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Drop the index so the next refresh reloads every skill."""
+        with self._lock:
+            self._sparse.clear()
+            self._dense.clear()
+            self._max_id = 0
+            self._max_user_id = 0
+            self.loaded = False
+
+    def refresh(self, db: Session) -> None:
+        """Load every skill on first use, then any skills added since."""
+        latest = db.query(func.max(models.Skill.id)).scalar() or 0
+        if self.loaded and latest <= self._max_id:
+            return
+        rows = (
+            db.query(func.lower(models.Skill.name), models.Skill.user_id, models.Skill.level)
+            .filter(models.Skill.id > self._max_id, models.Skill.id <= latest)
+            .all()
+        )
+        grouped: Dict[str, Dict[int, int]] = {}
+        for name, user_id, level in rows:
+            users = grouped.setdefault(name.strip(), {})
+            users[user_id] = max(users.get(user_id, 0), level)
+
+        with self._lock:
+            for users in grouped.values():
+                self._max_user_id = max(self._max_user_id, max(users))
+            for name, users in grouped.items():
+                if name in self._sparse or name in self._dense:
+                    for user_id, level in users.items():
+                        self._put(name, user_id, level, keep_higher=True)
+                    continue
+                user_ids = np.array(sorted(users), dtype=np.int32)
+                levels = np.array([users[u] for u in user_ids.tolist()], dtype=np.int8)
+                self._sparse[name] = (user_ids, levels)
+                self._maybe_densify(name)
+            self._max_id = max(self._max_id, latest)
+            self.loaded = True
+
+    def add(self, user_id: int, name: str, level: int) -> None:
+        """Index a newly created skill."""
+        if self.loaded:
+            with self._lock:
+                self._put(normalize_skill_name(name), user_id, level, keep_higher=True)
+
+    def set(self, user_id: int, name: str, level: Optional[int]) -> None:
+        """Set a user's level for a skill, or remove the user when level is None."""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._put(normalize_skill_name(name), user_id, level or 0, keep_higher=False)
+
+    def _put(self, name: str, user_id: int, level: int, keep_higher: bool) -> None:
+        """Insert, update or (level 0) remove one user's level; caller holds the lock."""
+        self._max_user_id = max(self._max_user_id, user_id)
+        dense = self._dense.get(name)
+        if dense is not None:
+            if user_id >= len(dense):
+                dense = np.concatenate([dense, np.zeros(user_id + 1 - len(dense) + len(dense) // 4, dtype=np.int8)])
+                self._dense[name] = dense
+            dense[user_id] = max(dense[user_id], level) if keep_higher else level
+            return
+
+        user_ids, levels = self._sparse.get(name, (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int8)))
+        position = int(np.searchsorted(user_ids, user_id))
+        if position < len(user_ids) and user_ids[position] == user_id:
+            if level or keep_higher:
+                levels[position] = max(levels[position], level) if keep_higher else level
+            elif len(user_ids) == 1:
+                # Drop the last holder's entry rather than keep empty arrays
+                del self._sparse[name]
+            else:
+                self._sparse[name] = (np.delete(user_ids, position), np.delete(levels, position))
+        elif level:
+            self._sparse[name] = (np.insert(user_ids, position, user_id), np.insert(levels, position, level))
+            self._maybe_densify(name)
+
+    def _maybe_densify(self, name: str) -> None:
+        """Switch a skill to dense storage once enough users hold it."""
+        user_ids, levels = self._sparse[name]
+        if len(user_ids) * DENSE_RATIO >= self._max_user_id + 1:
+            dense = np.zeros(self._max_user_id + 1, dtype=np.int8)
+            dense[user_ids] = levels
+            self._dense[name] = dense
+            del self._sparse[name]
+
+    def _levels_of(self, name: str, user_ids: np.ndarray) -> np.ndarray:
+        """Levels of a skill for the given users (0 where not held); caller holds the lock."""
+        dense = self._dense.get(name)
+        if dense is not None:
+            held = user_ids < len(dense)
+            return np.where(held, dense[np.minimum(user_ids, len(dense) - 1)], 0)
+        held_ids, held_levels = self._sparse.get(name, (None, None))
+        if held_ids is None or not len(held_ids):
+            return np.zeros(len(user_ids), dtype=np.int8)
+        positions = np.minimum(np.searchsorted(held_ids, user_ids), len(held_ids) - 1)
+        return np.where(held_ids[positions] == user_ids, held_levels[positions], 0)
+
+    def rank(self, requirements: Dict[str, int], k: int = 20) -> List[Dict[str, Any]]:
+        """
+        Return the k users who best meet a role's requirements.
+
+        Users are scored like gap_engine.compute_gap: partial credit of
+        min(level, required) per skill over the sum of required levels, so
+        users missing some skills still rank by what they have. Ties go to
+        the lower user_id.
+
+        Returns:
+            Candidates as {"user_id", "fit_score", "met"} by descending fit
+        """
+        total = sum(requirements.values())
+        if not total:
+            return []
+        with self._lock:
+            size = self._max_user_id + 1
+            # Required levels are small, so int8 holds the sum unless it exceeds 127
+            earned = np.zeros(size, dtype=np.int8 if total <= 127 else np.int32)
+            scratch = np.empty(size, dtype=np.int8)
+            for skill, required in requirements.items():
+                name = normalize_skill_name(skill)
+                required = np.int8(min(required, 127))
+                dense = self._dense.get(name)
+                if dense is not None:
+                    n = min(len(dense), size)
+                    np.minimum(dense[:n], required, out=scratch[:n])
+                    np.add(earned[:n], scratch[:n], out=earned[:n], casting="unsafe")
+                elif name in self._sparse:
+                    user_ids, levels = self._sparse[name]
+                    earned[user_ids] += np.minimum(levels, required)
+
+            # Select the k best in linear time; the key orders by score, then lower user_id
+            top = np.flatnonzero(earned)
+            if len(top) > k:
+                key = earned[top].astype(np.int64) * size - top
+                top = top[np.argpartition(-key, k - 1)[:k]]
+            top = top[np.lexsort((top, -earned[top].astype(np.int32)))]
+
+            met = np.zeros(len(top), dtype=np.int32)
+            for skill, required in requirements.items():
+                met += self._levels_of(normalize_skill_name(skill), top) >= required
+            scores = earned[top].astype(np.int32)
+
+        return [
+            {
+                "user_id": int(user_id),
+                "fit_score": round(100 * int(score) / total),
+                "met": int(count)
+            }
+            for user_id, score, count in zip(top, scores, met)
+        ]
+
+
+# Global skill index instance
+skill_index = SkillIndex()
@@ -0,0 +1,91 @@
+"""Canonical skill vocabulary and memoized resolution of skill names."""
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Any
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app import models
+
+load_dotenv()
+
+# Raw skill names remembered by the resolver
+RESOLVER_CACHE_SIZE = int(os.getenv("SKILL_RESOLVER_CACHE_SIZE", "10000"))
+
+
+def normalize_skill_key(name: str) -> str:
+    """
+    Normalize case, whitespace and punctuation of a skill name.
+
+    Hyphens, underscores and runs of whitespace become one space and
+    surrounding punctuation is dropped, while characters that distinguish
+    skills ("c++", "c#", "node.js") are kept.
+    """
+    key = unicodedata.normalize("NFKC", name).casefold()
+    key = re.sub(r"[\s_\-]+", " ", key)
+    return key.strip(" .,;:!?'\"()[]{}")
+
+
+class SkillVocabulary:
+    """
+    Alias table mapping normalized names to canonical skill names.
+
+    Names that are not in the vocabulary resolve to their normalized form,
+    so free-text skills still group consistently. The table loads once per
+    process; crud clears it when vocabulary entries are added.
+    """
+
+    def __init__(self, cache_size: int = RESOLVER_CACHE_SIZE):
+        """Initialize an empty, unloaded vocabulary."""
+        self._aliases: Dict[str, str] = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._resolve = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def clear(self) -> None:
+        """Drop the alias table and resolver cache so the next use reloads them."""
+        with self._lock:
+            self._aliases = {}
+            self.loaded = False
+            self._resolve.cache_clear()
+
+    def load(self, db: Session) -> None:
+        """Load every canonical name and alias."""
+        aliases = {}
+        for (name,) in db.query(models.CanonicalSkill.name):
+            aliases[name] = name
+        for alias, name in db.query(models.SkillAlias.alias, models.CanonicalSkill.name).join(models.SkillAlias.skill):
+            aliases[alias] = name
+        with self._lock:
+            self._aliases = aliases
+            self.loaded = True
+            self._resolve.cache_clear()
+
+    def canonicalize(self, db: Session, name: str) -> str:
+        """Resolve a skill name to its canonical form, loading the vocabulary on first use."""
+        if not self.loaded:
+            self.load(db)
+        return self._resolve(name)
+
+    def _lookup(self, name: str) -> str:
+        """Uncached resolution of one raw name."""
+        key = normalize_skill_key(name)
+        return self._aliases.get(key, key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return vocabulary size and resolver cache counters."""
+        info = self._resolve.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "aliases": len(self._aliases),
+            "cache_hits": info.hits,
+            "cache_misses": info.misses,
+            "cache_size": info.currsize,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Global skill vocabulary instance
+skill_vocabulary = SkillVocabulary()
@@ -0,0 +1,106 @@
+"""Resource version counters and ETag-based conditional responses."""
+import os
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app import models
+
+load_dotenv()
+
+# Roles and courses share one version
+CATALOG = "catalog"
+
+# Cache-Control for catalog reads; clients revalidate with If-None-Match
+CATALOG_CACHE_CONTROL = f"public, max-age={int(os.getenv('CATALOG_MAX_AGE', '60'))}"
+PROFILE_CACHE_CONTROL = "private, no-cache"
+
+# Dialect-specific INSERT constructs supporting ON CONFLICT
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def user_key(user_id: int) -> str:
+    """Version name of a user's profile (skills, certifications, achievements)."""
+    return f"user:{user_id}"
+
+
+def bump(db: Session, *names: str) -> None:
+    """
+    Increment versions in the caller's transaction; the caller commits.
+
+    Each batch is one INSERT ... ON CONFLICT DO UPDATE, so a name bumped
+    for the first time by two processes at once is counted twice instead
+    of failing the second insert on the primary key.
+    """
+    upsert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    names = sorted(set(names))
+    for start in range(0, len(names), 500):
+        statement = upsert(models.DataVersion).values(
+            [{"name": name, "version": 1} for name in names[start:start + 500]]
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[models.DataVersion.name],
+            set_={"version": models.DataVersion.version + 1}
+        ))
+
+
+def get_version(db: Session, name: str) -> int:
+    """Current version of a resource, 0 if it never changed."""
+    return db.execute(
+        select(models.DataVersion.version).where(models.DataVersion.name == name)
+    ).scalar() or 0
+
+
+def get_user_version(db: Session, user_id: int) -> Optional[int]:
+    """Current profile version of a user, 0 if it never changed, None if the user doesn't exist."""
+    row = db.execute(
+        select(models.DataVersion.version)
+        .select_from(models.User)
+        .outerjoin(models.DataVersion, models.DataVersion.name == user_key(user_id))
+        .where(models.User.id == user_id)
+    ).first()
+    return None if row is None else row.version or 0
+
+
+def make_etag(name: str, version: int) -> str:
+    """Strong ETag for a resource version."""
+    return f'"{name}.{version}"'
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: Optional[str] = None
+) -> Optional[Response]:
+    """
+    Set ETag and Cache-Control, and return a 304 response if the client's copy is current.
+
+    Returns:
+        A 304 Response to return as-is, or None to build the full response
+    """
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    client_tags = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in client_tags or f"W/{etag}" in client_tags or "*" in client_tags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def json_response(body: bytes, response: Response) -> Response:
+    """
+    Wrap pre-serialized JSON, keeping the ETag and Cache-Control set by not_modified.
+
+    A Response returned from a route bypasses the injected one, so its
+    caching headers are copied over explicitly.
+    """
+    headers = {
+        name: response.headers[name]
+        for name in ("etag", "cache-control")
+        if name in response.headers
+    }
+    return Response(content=body, media_type="application/json", headers=headers)
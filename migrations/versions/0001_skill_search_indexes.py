@@ -0,0 +1,32 @@
+"""Add skill search indexes
+
+Tables are created by init_db() (Base.metadata.create_all), which also
+creates these indexes on new databases. This revision adds them to
+databases created before they existed.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_skills_lname_user_id_level",
+        "skills",
+        [sa.text("lower(name)"), "user_id", "level"],
+        if_not_exists=True
+    )
+    op.create_index("ix_skills_user_id", "skills", ["user_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_skills_user_id", table_name="skills", if_exists=True)
+    op.drop_index("ix_skills_lname_user_id_level", table_name="skills", if_exists=True)
@@ -0,0 +1,40 @@
+"""Add skill vocabulary and alias tables
+
+init_db() also creates these tables, so each one is only created here when
+missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "skill_vocabulary" not in tables:
+        op.create_table(
+            "skill_vocabulary",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False, unique=True),
+        )
+        op.create_index("ix_skill_vocabulary_id", "skill_vocabulary", ["id"])
+    if "skill_aliases" not in tables:
+        op.create_table(
+            "skill_aliases",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("alias", sa.String(), nullable=False, unique=True),
+            sa.Column("skill_id", sa.Integer(), sa.ForeignKey("skill_vocabulary.id"), nullable=False),
+        )
+        op.create_index("ix_skill_aliases_id", "skill_aliases", ["id"])
+
+
+def downgrade():
+    op.drop_table("skill_aliases")
+    op.drop_table("skill_vocabulary")
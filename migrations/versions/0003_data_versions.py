@@ -0,0 +1,28 @@
+"""Add data version counters for ETags
+
+init_db() also creates this table, so it is only created here when missing.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "data_versions" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "data_versions",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("data_versions")
@@ -0,0 +1,122 @@
+"""Rewrite existing skill names to their canonical vocabulary form.
+
+Skills are processed in batches of users, so a user's rows that collapse
+to one canonical name (e.g. "Python" and "py") are merged into the oldest
+row at the highest level. Role requirement keys are canonicalized too.
+Restart the API afterwards so its in-memory skill indexes reload.
+
+Usage:
+    python scripts/backfill_skill_names.py [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import update, delete
+from sqlalchemy.orm import Session
+from app.db import SessionLocal, init_db
+from app import models, crud, versions
+from app.skill_vocabulary import skill_vocabulary
+
+
+def backfill_skills(db: Session, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    """Canonicalize skill names batch by batch, committing after each batch."""
+    stats = {"users": 0, "renamed": 0, "merged": 0}
+    after_id = 0
+    while True:
+        user_ids = [
+            user_id for (user_id,) in
+            db.query(models.Skill.user_id)
+            .filter(models.Skill.user_id > after_id)
+            .distinct()
+            .order_by(models.Skill.user_id)
+            .limit(batch_size)
+        ]
+        if not user_ids:
+            break
+
+        kept: Dict[tuple, Dict[str, Any]] = {}
+        changed = set()
+        deletes = []
+        for skill_id, user_id, name, level in (
+            db.query(models.Skill.id, models.Skill.user_id, models.Skill.name, models.Skill.level)
+            .filter(models.Skill.user_id.in_(user_ids))
+            .order_by(models.Skill.id)
+        ):
+            canonical = skill_vocabulary.canonicalize(db, name)
+            key = (user_id, canonical)
+            if key in kept:
+                deletes.append(skill_id)
+                kept[key]["level"] = max(kept[key]["level"], level)
+                changed.add(key)
+                continue
+            kept[key] = {"id": skill_id, "name": canonical, "level": level}
+            if name != canonical:
+                changed.add(key)
+
+        updates = [kept[key] for key in changed]
+        if updates:
+            db.execute(update(models.Skill), updates)
+        if deletes:
+            db.execute(delete(models.Skill).where(models.Skill.id.in_(deletes)))
+        if updates:
+            versions.bump(db, *(versions.user_key(user_id) for user_id, _ in changed))
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+        stats["users"] += len(user_ids)
+        stats["renamed"] += len(updates)
+        stats["merged"] += len(deletes)
+        after_id = user_ids[-1]
+        print(f"  users up to {after_id}: {len(updates)} renamed, {len(deletes)} merged")
+    return stats
+
+
+def backfill_roles(db: Session, dry_run: bool) -> int:
+    """Canonicalize role requirement keys."""
+    renamed = 0
+    for role in db.query(models.Role).all():
+        requirements = crud.canonical_requirements(db, role.requirements)
+        if requirements != role.requirements:
+            role.requirements = requirements
+            renamed += 1
+    if renamed:
+        versions.bump(db, versions.CATALOG)
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+    return renamed
+
+
+def main() -> None:
+    """Run the backfill."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Users per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        skill_vocabulary.load(db)
+        stats = backfill_skills(db, args.batch_size, args.dry_run)
+        roles = backfill_roles(db, args.dry_run)
+    finally:
+        db.close()
+
+    prefix = "Would update" if args.dry_run else "Updated"
+    print(
+        f"\n✅ {prefix} {stats['renamed']} skills and merged {stats['merged']} duplicates "
+        f"across {stats['users']} users; {roles} roles canonicalized"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""Benchmark API throughput and latency against a synthetic dataset.
+
+Runs the app in-process through httpx's ASGI transport, so no server or
+network is involved, against a temporary SQLite database seeded with the
+default roles and courses plus generated users. The LLM is replaced by
+the in-process StubProvider (or a ReplayProvider of recorded replies), so
+AI endpoints measure the app's own overhead. Results are printed (or written) as JSON to compare commits.
+
+Usage:
+    python scripts/benchmark.py [--users 1000] [--requests 500] [--concurrency 16]
+        [--scenarios user_get,analysis_fast] [--llm-latency-ms 50] [--output results.json]
+        [--baseline previous.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from urllib.parse import quote
+from typing import Dict, List, Any, Callable, Awaitable
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def scenario(name: str):
+    """Register a benchmark scenario under a name."""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def stub_llm(args):
+    """
+    Point both AI clients at the in-process stub or at recorded replies.
+
+    With --llm-record the configured provider (LLM_PROVIDER) is used
+    instead and its replies are recorded for later --llm-replay runs.
+    Either way calls go through a governor with the --llm-rpm/--llm-tpm
+    limits and the LLM_* retry and breaker settings.
+
+    Returns:
+        The governor, for its stats
+    """
+    from app.ai_client import ai_client, async_ai_client
+    from app.llm_governor import GovernedProvider, TokenBucket, make_governor
+    from app.llm_providers import StubBackend, StubProvider, ReplayProvider, RecordingProvider, llm_provider
+
+    governor = make_governor()
+    governor.requests = TokenBucket(args.llm_rpm)
+    governor.tokens = TokenBucket(args.llm_tpm)
+
+    if args.llm_record:
+        provider = RecordingProvider(llm_provider, args.llm_record)
+        ai_client.provider = async_ai_client.provider = GovernedProvider(provider, governor)
+        return governor
+
+    backend = StubBackend(
+        latency_ms=args.llm_latency_ms,
+        jitter=args.llm_jitter,
+        tokens_per_second=0,
+        error_rate=args.llm_error_rate,
+        seed=args.seed
+    )
+    provider = ReplayProvider(args.llm_replay, backend) if args.llm_replay else StubProvider(backend)
+    ai_client.provider = async_ai_client.provider = GovernedProvider(provider, governor)
+    return governor
+
+
+def populate(users: int, seed: int) -> Dict[str, Any]:
+    """
+    Insert generated users with skills, certifications and achievements.
+
+    Returns:
+        Context for the scenarios: generated user ID range, role and skill names
+    """
+    from sqlalchemy import insert, func
+    from app import models
+    from app.db import SessionLocal
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    try:
+        roles = [name for (name,) in db.query(models.Role.name).order_by(models.Role.id)]
+        skills = sorted({name for (name,) in db.query(models.CanonicalSkill.name)})
+        # Seed data may already contain users
+        first = (db.query(func.max(models.User.id)).scalar() or 0) + 1
+        last = first + users - 1
+        for start in range(first, last + 1, 1000):
+            ids = range(start, min(start + 1000, last + 1))
+            db.execute(insert(models.User), [
+                {"id": i, "email": f"user{i}@bench.local", "name": f"User {i}"} for i in ids
+            ])
+            db.execute(insert(models.Skill), [
+                {"user_id": i, "name": name, "level": rng.randint(1, 5)}
+                for i in ids for name in rng.sample(skills, rng.randint(3, min(8, len(skills))))
+            ])
+            db.execute(insert(models.Certification), [
+                {"user_id": i, "name": f"Cert {n}", "issuer": "Issuer", "date_obtained": "2024"}
+                for i in ids for n in range(2)
+            ])
+            db.execute(insert(models.Achievement), [
+                {"user_id": i, "title": f"Achievement {n}", "description": "Shipped a project", "date": "2024"}
+                for i in ids for n in range(3)
+            ])
+        db.commit()
+    finally:
+        db.close()
+    return {"first_user": first, "last_user": last, "roles": roles, "skills": skills}
+
+
+def random_user(rng: random.Random, ctx: Dict[str, Any]) -> int:
+    """ID of a random generated user."""
+    return rng.randint(ctx["first_user"], ctx["last_user"])
+
+
+@scenario("user_get")
+async def user_get(client, rng, ctx):
+    """Fetch one user's profile."""
+    return await client.get(f"/users/{random_user(rng, ctx)}")
+
+
+@scenario("users_list")
+async def users_list(client, rng, ctx):
+    """Page through users with their relationships."""
+    return await client.get("/users/?limit=50&include=skills")
+
+
+@scenario("skill_create")
+async def skill_create(client, rng, ctx):
+    """Add a skill to a random user."""
+    return await client.post(
+        f"/skills/users/{random_user(rng, ctx)}",
+        json={"name": rng.choice(ctx["skills"]), "level": rng.randint(1, 5)}
+    )
+
+
+@scenario("roles_list")
+async def roles_list(client, rng, ctx):
+    """List the role catalog."""
+    return await client.get("/roles/")
+
+
+@scenario("courses_list")
+async def courses_list(client, rng, ctx):
+    """List the course catalog."""
+    return await client.get("/courses/")
+
+
+@scenario("role_candidates")
+async def role_candidates(client, rng, ctx):
+    """Rank users for a role."""
+    return await client.get(f"/roles/{rng.choice(ctx['roles'])}/candidates?k=20")
+
+
+@scenario("role_fit")
+async def role_fit(client, rng, ctx):
+    """Rank roles for a user."""
+    return await client.get(f"/users/{random_user(rng, ctx)}/role-fit")
+
+
+@scenario("analysis_fast")
+async def analysis_fast(client, rng, ctx):
+    """Local gap analysis."""
+    body = {"user_id": random_user(rng, ctx), "role": rng.choice(ctx["roles"])}
+    return await client.post("/analysis/?mode=fast", json=body)
+
+
+@scenario("analysis_ai")
+async def analysis_ai(client, rng, ctx):
+    """LLM gap analysis; mostly cache misses as users are drawn at random."""
+    body = {"user_id": random_user(rng, ctx), "role": rng.choice(ctx["roles"])}
+    return await client.post("/analysis/?mode=ai", json=body)
+
+
+@scenario("analysis_hybrid")
+async def analysis_hybrid(client, rng, ctx):
+    """Local analysis with an LLM-written narrative."""
+    body = {"user_id": random_user(rng, ctx), "role": rng.choice(ctx["roles"])}
+    return await client.post("/analysis/?mode=hybrid", json=body)
+
+
+@scenario("quiz")
+async def quiz(client, rng, ctx):
+    """Generate a quiz and submit answers to it."""
+    # Escape names like "c#"; a decoded "/" would still split the path
+    skill = quote(rng.choice([name for name in ctx["skills"] if "/" not in name]), safe="")
+    generated = await client.get(f"/quiz/{skill}")
+    if generated.status_code >= 400 or "attempt_id" not in generated.json():
+        return generated
+    return await client.post(
+        f"/quiz/{skill}/submit",
+        json={"attempt_id": generated.json()["attempt_id"], "answers": [0, 1, 0, 2]}
+    )
+
+
+def is_error(response) -> bool:
+    """Whether a response failed, including 200s carrying an error payload."""
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        return isinstance(body, dict) and "error" in body
+    return False
+
+
+async def run_scenario(app, name: str, ctx: Dict[str, Any], args) -> Dict[str, Any]:
+    """Warm up, then send args.requests requests with args.concurrency in flight."""
+    import httpx
+
+    func = SCENARIOS[name]
+    rng = random.Random(f"{args.seed}:{name}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for _ in range(args.warmup):
+            await func(client, rng, ctx)
+
+        latencies: List[float] = []
+        errors = 0
+        remaining = args.requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await func(client, rng, ctx)
+                latencies.append(time.perf_counter() - start)
+                errors += is_error(response)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(float(ms.mean()), 3),
+            "p50": round(float(np.percentile(ms, 50)), 3),
+            "p95": round(float(np.percentile(ms, 95)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3),
+            "max": round(float(ms.max()), 3)
+        }
+    }
+
+
+def git_commit() -> str:
+    """Short hash of the checked-out commit, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print percentile changes against a baseline report to stderr."""
+    print(f"\nvs {baseline['meta']['commit']}:", file=sys.stderr)
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        changes = "  ".join(
+            f"{p} {100 * (result['latency_ms'][p] / previous['latency_ms'][p] - 1):+6.1f}%"
+            for p in ("p50", "p95", "p99")
+            if previous["latency_ms"][p]
+        )
+        print(f"{name:16} {changes}", file=sys.stderr)
+
+
+def main() -> int:
+    """Build the dataset, run the selected scenarios and emit JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic users to generate")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="Median latency of each stubbed LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Log-normal sigma of the stub latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of stubbed LLM calls that fail")
+    parser.add_argument("--llm-rpm", type=float, default=0, help="LLM requests per minute allowed (0 = unlimited)")
+    parser.add_argument("--llm-tpm", type=float, default=0, help="LLM tokens per minute allowed (0 = unlimited)")
+    parser.add_argument("--llm-replay", help="Replay LLM replies recorded with --llm-record instead of the stub")
+    parser.add_argument("--llm-record", help="Call the configured LLM provider and record its replies here")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and requests")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to print p50/p95/p99 changes against")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    # Use a throwaway database, cache and attempt store; the app reads these at import
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/benchmark.db"
+    os.environ["ANALYSIS_CACHE_PATH"] = f"{tmp}/analysis_cache.db"
+    os.environ["QUIZ_STORE_BACKEND"] = "memory"
+    os.environ["QUIZ_POOL_ENABLED"] = "false"
+
+    from app.main import app
+    from seed_db import seed_database
+
+    print(f"Seeding {args.users} users in {tmp}...", file=sys.stderr)
+    # Keep stdout for the JSON report
+    with redirect_stdout(sys.stderr):
+        seed_database()
+    ctx = populate(args.users, args.seed)
+    governor = stub_llm(args)
+
+    results = {}
+    for name in names:
+        results[name] = asyncio.run(run_scenario(app, name, ctx, args))
+        latency = results[name]["latency_ms"]
+        print(
+            f"{name:16} {results[name]['throughput_rps']:9.1f} req/s  "
+            f"p50 {latency['p50']:8.2f} ms  p95 {latency['p95']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+            f"errors {results[name]['errors']}",
+            file=sys.stderr
+        )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter": args.llm_jitter,
+            "llm_error_rate": args.llm_error_rate,
+            "llm_rpm": args.llm_rpm,
+            "llm_tpm": args.llm_tpm,
+            "llm_replay": args.llm_replay,
+            "llm_record": args.llm_record,
+            "seed": args.seed,
+            "db_profile": os.getenv("DB_PROFILE", "development")
+        },
+        "results": results,
+        "llm_governor": governor.get_stats()
+    }
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text()))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
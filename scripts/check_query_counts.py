@@ -0,0 +1,106 @@
+"""Check that API endpoints stay within their SQL query budgets.
+
+Runs the app in-process against a temporary SQLite database seeded with
+users that have several skills, certifications and achievements, and
+fails if any endpoint issues more queries than allowed. Query counts must
+not grow with the number of users or profile rows (no N+1 lazy loads).
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Use a throwaway database and cache, and keep AI features off
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/query_counts.db"
+os.environ["ANALYSIS_CACHE_PATH"] = f"{_tmp}/analysis_cache.db"
+os.environ["GROQ_API_KEY"] = ""
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db import count_queries
+from seed_db import seed_database
+
+USERS = 50
+
+# (method, path, body, max queries)
+BUDGETS = [
+    ("GET", "/users/1", None, 2),
+    ("GET", f"/users/?limit={USERS}", None, 4),
+    ("GET", "/users/1/role-fit", None, 3),
+    ("GET", "/roles/", None, 1),
+    ("GET", "/roles/Data Scientist/candidates", None, 2),
+    ("GET", "/courses/", None, 1),
+    ("POST", "/skills/users/1", {"name": "go", "level": 2}, 4),
+    ("POST", "/analysis/?mode=fast", {"user_id": 1, "role": "Data Scientist"}, 3),
+    ("POST", "/analysis/batch?mode=fast", {"user_ids": list(range(1, USERS + 1)), "roles": ["Data Scientist"]}, 6),
+]
+
+# (path, max queries) for a revalidation with a current ETag, which must be a 304
+CONDITIONAL_BUDGETS = [
+    ("/users/1", 1),
+    ("/roles/", 1),
+    ("/courses/", 1),
+]
+
+
+def populate(client: TestClient) -> None:
+    """Create users with several profile rows each."""
+    for i in range(USERS):
+        user = client.post("/users/", json={"email": f"user{i}@example.com", "name": f"User {i}"}).json()
+        for skill, level in [("python", 3), ("sql", 2), ("ml", 1)]:
+            client.post(f"/skills/users/{user['id']}", json={"name": skill, "level": level})
+        for n in range(2):
+            client.post(
+                f"/certifications/users/{user['id']}",
+                json={"name": f"Cert {n}", "issuer": "Issuer", "date_obtained": "2024"}
+            )
+            client.post(
+                f"/achievements/users/{user['id']}",
+                json={"title": f"Achievement {n}", "description": "Did things", "date": "2024"}
+            )
+
+
+def main() -> int:
+    """Run every endpoint once to warm up, then check its query count."""
+    seed_database()
+    failures = 0
+    with TestClient(app) as client:
+        populate(client)
+        for method, path, body, budget in BUDGETS:
+            client.request(method, path, json=body)
+            with count_queries() as statements:
+                response = client.request(method, path, json=body)
+            status = "ok" if len(statements) <= budget and response.status_code < 400 else "FAIL"
+            failures += status == "FAIL"
+            print(f"{status:4} {method:6} {path:40} {len(statements):3} queries (budget {budget}, HTTP {response.status_code})")
+        for path, budget in CONDITIONAL_BUDGETS:
+            etag = client.get(path).headers["etag"]
+            with count_queries() as statements:
+                response = client.get(path, headers={"If-None-Match": etag})
+            status = "ok" if len(statements) <= budget and response.status_code == 304 else "FAIL"
+            failures += status == "FAIL"
+            print(f"{status:4} {'GET':6} {path + ' (If-None-Match)':40} {len(statements):3} queries (budget {budget}, HTTP {response.status_code})")
+        failures += check_rank_after_delete(client)
+    return 1 if failures else 0
+
+
+def check_rank_after_delete(client: TestClient) -> int:
+    """Rank candidates after removing the only holder of a sparsely indexed skill; returns failures."""
+    path = "/roles/Data Scientist/candidates"
+    skill = client.post("/skills/users/1", json={"name": "statistics", "level": 3}).json()
+    client.get(path)
+    client.delete(f"/skills/{skill['id']}")
+    with count_queries() as statements:
+        response = client.get(path)
+    status = "ok" if len(statements) <= 2 and response.status_code == 200 else "FAIL"
+    label = path + " (after delete)"
+    print(f"{status:4} {'GET':6} {label:40} {len(statements):3} queries (budget 2, HTTP {response.status_code})")
+    return status == "FAIL"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.db import SessionLocal, init_db
-from app import models
+from app import models, versions
 
 def seed_database():
     """Seed the database with initial data."""
@@ -24,6 +24,23 @@ def seed_database():
         else:
             print("✓ Default user already exists")
 
+        # Load and create the canonical skill vocabulary
+        skills_file = Path(__file__).parent.parent / "seed" / "skills.json"
+        with open(skills_file, "r") as f:
+            skills_data = json.load(f)
+
+        created = 0
+        for skill_data in skills_data:
+            existing_skill = db.query(models.CanonicalSkill).filter_by(name=skill_data["name"]).first()
+            if not existing_skill:
+                skill = models.CanonicalSkill(
+                    name=skill_data["name"],
+                    aliases=[models.SkillAlias(alias=alias) for alias in skill_data["aliases"]]
+                )
+                db.add(skill)
+                created += 1
+        print(f"✓ Created {created} vocabulary skills ({len(skills_data) - created} already existed)")
+
         # Load and create roles
         roles_file = Path(__file__).parent.parent / "seed" / "roles.json"
         with open(roles_file, "r") as f:
@@ -57,6 +74,8 @@ def seed_database():
             else:
                 print(f"✓ Course already exists: {course_data['title']}")
 
+        # Invalidate catalog caches and ETags in running servers
+        versions.bump(db, versions.CATALOG)
         db.commit()
         print("\n✅ Database seeding completed successfully!")
 